@@ -0,0 +1,184 @@
+"""Fast lookups of the JRC-IDEES appendix tables.
+
+The appendix is shipped as OpenDocument spreadsheets, which are slow to read.
+On first use, each table is compiled into a small JSON file in the user cache
+(keyed by the hash of the spreadsheet), so later runs never touch the ODS files.
+"""
+
+import hashlib
+import importlib.resources
+import json
+import os
+import zipfile
+from functools import cache
+from pathlib import Path
+from typing import Literal
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+import yaml
+
+APPENDIX_TABLES = Literal[
+    "fuel_code_idees_to_eurostat",
+    "categories_energy_intensive",
+    "categories_non_energy_intensive",
+]
+ODS_NAMESPACES = {
+    "table": "urn:oasis:names:tc:opendocument:xmlns:table:1.0",
+    "text": "urn:oasis:names:tc:opendocument:xmlns:text:1.0",
+}
+CACHE_ENV_VAR = "EC_JRC_IDEES_CACHE"
+
+
+def get_cache_dir() -> Path:
+    """Get the folder where compiled lookups are stored."""
+    default = Path.home() / ".cache" / "ec_jrc_idees"
+    return Path(os.environ.get(CACHE_ENV_VAR, default)) / "appendix"
+
+
+def read_ods_table(path: str | Path) -> list[list[str]]:
+    """Read the text of the first table in an OpenDocument spreadsheet.
+
+    Cells are stripped of surrounding whitespace. Repeated cells are expanded,
+    except trailing empty cells. Empty rows are removed.
+    """
+    with zipfile.ZipFile(path) as ods:
+        root = ElementTree.fromstring(ods.read("content.xml"))
+    table = root.find(".//table:table", ODS_NAMESPACES)
+    if table is None:
+        raise ValueError(f"No table found in '{path}'.")
+    repeat_attr = f"{{{ODS_NAMESPACES['table']}}}number-columns-repeated"
+    rows = []
+    for row in table.iterfind(".//table:table-row", ODS_NAMESPACES):
+        cells: list[str] = []
+        empty = 0
+        for cell in row.iterfind("table:table-cell", ODS_NAMESPACES):
+            text = " ".join(
+                "".join(par.itertext())
+                for par in cell.iterfind("text:p", ODS_NAMESPACES)
+            ).strip()
+            repeat = int(cell.get(repeat_attr, "1"))
+            if not text:
+                # Trailing empty cells are often repeated thousands of times,
+                # so they are only added when followed by text.
+                empty += repeat
+                continue
+            cells += [""] * empty + [text] * repeat
+            empty = 0
+        if cells:
+            rows.append(cells)
+    return rows
+
+
+def compile_table(name: APPENDIX_TABLES, cache_dir: Path | None = None) -> Path:
+    """Compile an appendix table into a cached JSON file of records."""
+    source = importlib.resources.files("ec_jrc_idees") / f"config/appendix/{name}.ods"
+    digest = hashlib.sha256(source.read_bytes()).hexdigest()[:16]
+    cache_dir = get_cache_dir() if cache_dir is None else cache_dir
+    compiled = cache_dir / f"{name}-{digest}.json"
+    if not compiled.exists():
+        with importlib.resources.as_file(source) as path:
+            header, *rows = read_ods_table(path)
+        records = [
+            dict(zip(header, row + [""] * (len(header) - len(row)))) for row in rows
+        ]
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = compiled.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(records))
+        tmp.replace(compiled)
+    return compiled
+
+
+@cache
+def get_table(name: APPENDIX_TABLES) -> tuple[dict[str, str], ...]:
+    """Get the records of an appendix table, compiling it if necessary."""
+    return tuple(json.loads(compile_table(name).read_text()))
+
+
+@cache
+def get_biofuels() -> dict[str, dict[str, dict]]:
+    """Get the biofuel carriers of each sector and the fossil fuel they split from."""
+    path = importlib.resources.files("ec_jrc_idees") / "config/appendix/biofuels.yaml"
+    return yaml.safe_load(path.read_text())
+
+
+@cache
+def get_fuel_codes(sector: str) -> dict[str, tuple[str, ...]]:
+    """Get the Eurostat codes of each IDEES fuel in a sector (e.g., 'Road transport').
+
+    Fuels can be looked up by their IDEES label (e.g., 'Diesel oil') or code ('Diesel').
+    Biofuel carriers of tidy data (e.g., 'BioDiesel') are also included, and
+    their codes are removed from the fossil fuels they split from (see
+    `config/appendix/biofuels.yaml`), so no code belongs to two carriers.
+    """
+    biofuels = get_biofuels().get(sector, {})
+    fuel_codes: dict[str, tuple[str, ...]] = {}
+    labels: dict[str, tuple[str, ...]] = {}
+    for record in get_table("fuel_code_idees_to_eurostat"):
+        if record["Sector"] != sector:
+            continue
+        # The appendix mixes ',' and ';' as separators.
+        codes = record["Eurostat_codes"].replace(",", ";")
+        eurostat = tuple(code.strip() for code in codes.split(";") if code.strip())
+        for biofuel, rule in biofuels.items():
+            if rule["fossil"] != record["IDEES_fuel_code"]:
+                continue
+            unknown = set(rule["codes"]) - set(eurostat)
+            if unknown:
+                raise ValueError(f"Codes of '{biofuel}' not in appendix: {unknown}.")
+            eurostat = tuple(code for code in eurostat if code not in rule["codes"])
+        fuel_codes[record["IDEES_fuel_code"]] = eurostat
+        labels[record["IDEES_fuel_label"]] = eurostat
+    if not labels:
+        raise ValueError(f"No fuel codes found for sector '{sector}'.")
+    missing = {rule["fossil"] for rule in biofuels.values()} - set(fuel_codes)
+    if missing:
+        raise ValueError(f"Fossil fuels of biofuels not in the appendix: {missing}.")
+    bio_codes = {biofuel: tuple(rule["codes"]) for biofuel, rule in biofuels.items()}
+    # Labels take priority over codes if both match.
+    return fuel_codes | labels | bio_codes
+
+
+@cache
+def get_process_categories(energy_intensive: bool = True) -> dict[str, tuple[str, ...]]:
+    """Get the process-related energy uses of each industry sector.
+
+    For energy intensive industries, sectors are keyed as 'sector/subsector'.
+    """
+    if energy_intensive:
+        table = get_table("categories_energy_intensive")
+    else:
+        table = get_table("categories_non_energy_intensive")
+    processes: dict[str, list[str]] = {}
+    for record in table:
+        key = record["Sector"]
+        if energy_intensive:
+            key += "/" + record["Subsector"]
+        processes.setdefault(key, []).append(record["Process-related energy use"])
+    return {key: tuple(values) for key, values in processes.items()}
+
+
+def map_to_eurostat(
+    fuels: pd.Series, sector: str, errors: Literal["raise", "ignore"] = "raise"
+) -> pd.Series:
+    """Map a column of IDEES fuels or carriers to their Eurostat codes.
+
+    Only fuels present in the column are looked up, so long columns are mapped
+    cheaply and unused categories of categorical columns are ignored.
+    """
+    lookup = get_fuel_codes(sector)
+    categories = fuels.astype("category").cat.remove_unused_categories()
+    # The extra last item catches missing values (category code -1).
+    mapped = np.full(len(categories.cat.categories) + 1, None, dtype="object")
+    for i, fuel in enumerate(categories.cat.categories):
+        mapped[i] = lookup.get(fuel)
+    if errors == "raise":
+        missing = [fuel for fuel in categories.cat.categories if fuel not in lookup]
+        if missing:
+            raise ValueError(f"No Eurostat codes for '{sector}' fuels: {missing}.")
+    return pd.Series(
+        mapped[categories.cat.codes.to_numpy()],
+        index=fuels.index,
+        name="eurostat_codes",
+    )
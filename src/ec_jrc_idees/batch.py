@@ -0,0 +1,301 @@
+"""Fault-isolated batch processing with a checkpoint journal.
+
+Each work unit (one sector file of a country and version) runs on its own.
+Failures are recorded instead of stopping the batch, and every finished unit is
+appended to a journal so interrupted runs can resume where they stopped.
+Settings, downloads and output locations are shared by all ways of running units
+(the command line, task graphs and the service).
+"""
+
+import hashlib
+import json
+import os
+import time
+import traceback
+import zipfile
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Literal, NamedTuple
+
+import pandas as pd
+
+from ec_jrc_idees import utils
+from ec_jrc_idees.parser import EasyIDEES
+
+STATUS = Literal["done", "failed"]
+
+
+class WorkUnit(NamedTuple):
+    """Smallest independent piece of a batch run."""
+
+    version: int
+    country: str
+    sector: str
+
+
+class Options(NamedTuple):
+    """Settings shared by all batch work units."""
+
+    sectors: list[str]
+    sheets: list[str] | None
+    sections: list[str] | None
+    layout: utils.LAYOUTS
+    backend: utils.BACKENDS
+    output_dir: Path
+    fmt: utils.OUTPUT_FORMATS
+    cache_dir: Path
+    cache: bool
+    store: Path | None
+    unit_system: str | None = None
+    value_dtype: utils.VALUE_DTYPES = "float64"
+    year_dtype: utils.YEAR_DTYPES = "int64"
+
+    def get_fingerprint(self) -> str:
+        """Identify the settings that change outputs (see `Journal`)."""
+        settings = self._asdict()
+        for name in ("sectors", "output_dir", "cache_dir", "cache"):
+            settings.pop(name)
+        return get_fingerprint(settings)
+
+
+class Written(NamedTuple):
+    """Files saved for a work unit, and the names of its failed checks."""
+
+    paths: list[Path]
+    failed_checks: list[str]
+
+
+class RetryPolicy(NamedTuple):
+    """How often, and for which errors, a failing unit is attempted again.
+
+    Only errors of the types in `retry_on` are retried (by default, I/O issues
+    such as broken downloads). Other errors (e.g., failed data checks) are
+    assumed to be deterministic and fail the unit at once.
+    """
+
+    max_attempts: int = 1
+    delay: float = 0.0
+    backoff: float = 2.0
+    retry_on: tuple[type[Exception], ...] = (OSError, zipfile.BadZipFile)
+
+    def get_delay(self, attempt: int) -> float:
+        """Get the waiting time in seconds after a failed attempt (1-based)."""
+        return self.delay * self.backoff ** (attempt - 1)
+
+
+class Outcome(NamedTuple):
+    """Result of running a work unit."""
+
+    unit: WorkUnit
+    status: STATUS
+    attempts: int
+    error: str | None = None
+    result: Any = None
+
+
+class Journal:
+    """Append-only JSON lines record of finished work units.
+
+    The latest entry of a unit defines its status. Entries are flushed to disk
+    as soon as they are written, so the journal survives crashes.
+    Entries are tagged with a fingerprint of the run settings. Units whose latest
+    entry comes from a run with other settings are processed again, since their
+    outputs may have been written differently.
+    """
+
+    def __init__(self, path: str | Path, fingerprint: str = "") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = fingerprint
+
+    def record(self, outcome: Outcome) -> None:
+        """Save the outcome of a work unit."""
+        entry = outcome.unit._asdict() | {
+            "status": outcome.status,
+            "attempts": outcome.attempts,
+            "error": outcome.error,
+            "fingerprint": self.fingerprint,
+            "time": time.time(),
+        }
+        with self.path.open("a") as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def load(self) -> dict[WorkUnit, str]:
+        """Get the latest status of every recorded work unit.
+
+        Units last recorded with other settings are reported as 'stale'.
+        Incomplete last lines (e.g., from a crash mid-write) are ignored.
+        """
+        statuses: dict[WorkUnit, str] = {}
+        if not self.path.exists():
+            return statuses
+        for line in self.path.read_text().splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            unit = WorkUnit(entry["version"], entry["country"], entry["sector"])
+            if entry.get("fingerprint", "") == self.fingerprint:
+                statuses[unit] = entry["status"]
+            else:
+                statuses[unit] = "stale"
+        return statuses
+
+    def get_pending(self, units: Iterable[WorkUnit]) -> list[WorkUnit]:
+        """Get units that have not yet finished successfully."""
+        statuses = self.load()
+        return [unit for unit in units if statuses.get(unit) != "done"]
+
+
+def get_fingerprint(settings: dict) -> str:
+    """Identify run settings, to tell apart journal entries of different runs."""
+    text = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+def get_output_path(
+    output_dir: Path,
+    metadata: utils.Metadata,
+    sheet: str,
+    section: str,
+    fmt: utils.OUTPUT_FORMATS,
+) -> Path:
+    """Get the location of a tidy section, partitioned by version and section."""
+    version, sector, country = metadata
+    return output_dir / str(version) / sector / sheet / section / f"{country}.{fmt}"
+
+
+def fetch_country(easy: EasyIDEES, country: str, cache_dir: Path, cache: bool) -> Path:
+    """Download and unzip country files, re-using previous downloads if requested.
+
+    Broken zips are removed, so later attempts download them again.
+    """
+    version_dir = cache_dir / f"v{easy.version}"
+    version_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = version_dir / f"idees_{country}.zip"
+    country_dir = version_dir / country
+    if cache and country_dir.exists():
+        return country_dir
+    if not (cache and zip_path.exists()):
+        easy.download_country(country, zip_path, overwrite=True)
+    try:
+        easy.unzip(zip_path, country_dir)
+    except zipfile.BadZipFile:
+        zip_path.unlink(missing_ok=True)
+        raise
+    return country_dir
+
+
+def tidy_unit(
+    unit: WorkUnit, country_dir: Path, options: Options
+) -> tuple[dict[str, dict[str, pd.DataFrame]], pd.DataFrame | None]:
+    """Process all requested sections of a sector file.
+
+    Returns the tidy sections of each sheet and the validation report of the file.
+    Lazy mappings are evaluated here, so results are plain (picklable) objects.
+    """
+    version, country, sector = unit
+    easy = EasyIDEES(version, options.store)
+    results = easy.process_country(
+        country,
+        country_dir,
+        [sector],
+        options.sheets,
+        options.sections,
+        layout=options.layout,
+        backend=options.backend,
+        unit_system=options.unit_system,
+        value_dtype=options.value_dtype,
+        year_dtype=options.year_dtype,
+    )
+    tidy_sheets = {sheet: dict(sections) for sheet, sections in results[sector].items()}
+    return tidy_sheets, easy.check_reports[sector]
+
+
+def write_unit(
+    unit: WorkUnit,
+    tidy_sheets: dict[str, dict[str, pd.DataFrame]],
+    report: pd.DataFrame | None,
+    options: Options,
+) -> Written:
+    """Save the tidy sections and validation report of a sector file.
+
+    Failed checks are returned rather than reported, so callers decide how to
+    tell users about them.
+    """
+    version, country, sector = unit
+    paths = []
+    for sheet, tidy_sections in tidy_sheets.items():
+        for section, tidy_df in tidy_sections.items():
+            path = get_output_path(
+                options.output_dir,
+                utils.Metadata(version, sector, country),
+                sheet,
+                section,
+                options.fmt,
+            )
+            utils.write_dataframe(tidy_df, path, options.fmt)
+            paths.append(path)
+    failed: list[str] = []
+    if report is not None:
+        report_path = (
+            options.output_dir / "checks" / f"{version}_{sector}_{country}.csv"
+        )
+        utils.write_dataframe(report, report_path, "csv")
+        failed = report.loc[report["status"] == "failed", "check"].to_list()
+    return Written(paths, failed)
+
+
+def run_unit(
+    worker: Callable[[WorkUnit], Any], unit: WorkUnit, policy: RetryPolicy
+) -> Outcome:
+    """Run a work unit, retrying according to the policy, without raising."""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return Outcome(unit, "done", attempt, result=worker(unit))
+        except Exception as error:
+            if attempt >= policy.max_attempts or not isinstance(error, policy.retry_on):
+                message = "".join(traceback.format_exception_only(error)).strip()
+                return Outcome(unit, "failed", attempt, error=message)
+            time.sleep(policy.get_delay(attempt))
+
+
+def run_batch(
+    units: Iterable[WorkUnit],
+    worker: Callable[[WorkUnit], Any],
+    journal: Journal | None = None,
+    policy: RetryPolicy = RetryPolicy(),
+    jobs: int = 1,
+) -> Iterator[Outcome]:
+    """Run work units in isolation, yielding their outcomes as they finish.
+
+    If a journal is given, units that already finished successfully are skipped
+    and new outcomes are recorded. With several jobs, `worker` must be picklable.
+    """
+    pending = list(units) if journal is None else journal.get_pending(units)
+    if jobs == 1:
+        for unit in pending:
+            outcome = run_unit(worker, unit, policy)
+            if journal is not None:
+                journal.record(outcome)
+            yield outcome
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(run_unit, worker, unit, policy): unit for unit in pending
+        }
+        for future in as_completed(futures):
+            try:
+                outcome = future.result()
+            except Exception as error:
+                # The worker process itself died (e.g., out of memory).
+                message = "".join(traceback.format_exception_only(error)).strip()
+                outcome = Outcome(futures[future], "failed", 1, error=message)
+            if journal is not None:
+                journal.record(outcome)
+            yield outcome
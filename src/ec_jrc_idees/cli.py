@@ -0,0 +1,399 @@
+"""Command-line interface for batch processing of JRC-IDEES data."""
+
+import argparse
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+from ec_jrc_idees import utils
+from ec_jrc_idees.batch import (
+    Journal,
+    Options,
+    Outcome,
+    RetryPolicy,
+    WorkUnit,
+    fetch_country,
+    run_batch,
+    tidy_unit,
+    write_unit,
+)
+from ec_jrc_idees.parser import FILE_CLEANERS, EasyIDEES
+from ec_jrc_idees.units import get_unit_systems
+
+
+class Timing(NamedTuple):
+    """Duration of a processing stage."""
+
+    version: int
+    country: str
+    stage: str
+    seconds: float
+
+
+@contextmanager
+def timed(timings: list[Timing], version: int, country: str, stage: str) -> Iterator:
+    """Record the duration of a processing stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append(Timing(version, country, stage, time.perf_counter() - start))
+
+
+def process_unit(unit: WorkUnit, options: Options) -> tuple[list[Timing], list[str]]:
+    """Download, clean and save all requested data of one sector file.
+
+    Returns the duration of each stage and the names of failed checks.
+    """
+    timings: list[Timing] = []
+    version, country, sector = unit
+    with timed(timings, version, country, "fetch"):
+        country_dir = fetch_country(
+            EasyIDEES(version), country, options.cache_dir, options.cache
+        )
+    with timed(timings, version, country, f"tidy:{sector}"):
+        tidy_sheets, report = tidy_unit(unit, country_dir, options)
+    with timed(timings, version, country, f"write:{sector}"):
+        written = write_unit(unit, tidy_sheets, report, options)
+    return timings, written.failed_checks
+
+
+def summarise_timings(timings: list[Timing]) -> pd.DataFrame:
+    """Aggregate stage durations into a profiling report."""
+    data = pd.DataFrame(timings, columns=list(Timing._fields))
+    data["stage"] = data["stage"].str.split(":").str[0]
+    report = data.groupby("stage")["seconds"].agg(["count", "sum", "mean", "max"])
+    return report.sort_values("sum", ascending=False)
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="ec-jrc-idees", description="Easy JRC-IDEES data processing."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    process = subparsers.add_parser(
+        "process", help="Download, tidy and save JRC-IDEES data."
+    )
+    process.add_argument(
+        "--versions",
+        nargs="+",
+        type=int,
+        default=[2021],
+        help="JRC-IDEES version(s) to process.",
+    )
+    process.add_argument(
+        "--countries",
+        nargs="+",
+        help="Eurostat country codes to process. Defaults to all in each version.",
+    )
+    process.add_argument(
+        "--sectors",
+        nargs="+",
+        choices=list(FILE_CLEANERS),
+        default=list(FILE_CLEANERS),
+        help="Sector files to process.",
+    )
+    process.add_argument("--sheets", nargs="+", help="Only process these sheets.")
+    process.add_argument("--sections", nargs="+", help="Only process these sections.")
+    process.add_argument(
+        "--layout",
+        choices=["long", "wide"],
+        default="long",
+        help="Melt years into a column (long) or keep them as columns (wide).",
+    )
+    process.add_argument(
+        "--backend",
+        choices=["pandas", "polars"],
+        default="pandas",
+        help="Library used to reshape and validate data (polars is optional).",
+    )
+    process.add_argument(
+        "--unit-system",
+        choices=get_unit_systems(),
+        help="Convert values to this unit system. Defaults to original units.",
+    )
+    process.add_argument(
+        "--value-dtype",
+        choices=["float64", "float32"],
+        default="float64",
+        help="Data type of values (float32 halves memory use).",
+    )
+    process.add_argument(
+        "--year-dtype",
+        choices=["int64", "int16"],
+        default="int64",
+        help="Data type of years in the long layout.",
+    )
+    process.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Number of parallel processes."
+    )
+    process.add_argument(
+        "--format",
+        dest="fmt",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Output file format (parquet requires the optional 'pyarrow' package).",
+    )
+    process.add_argument(
+        "-o", "--output-dir", type=Path, default=Path("idees"), help="Output folder."
+    )
+    process.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path(".cache/ec_jrc_idees"),
+        help="Folder for downloaded files.",
+    )
+    process.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Re-use previously downloaded files.",
+    )
+    process.add_argument(
+        "--store",
+        type=Path,
+        help="Also load results into this SQLite database for fast querying.",
+    )
+    process.add_argument(
+        "--scheduler",
+        help=(
+            "Run as a task graph on a Dask scheduler address, or 'local' to start a "
+            "local cluster with --jobs workers. Outputs are the same as without a "
+            "scheduler, plus one combined file per version and section. --store and "
+            "--profile are not supported. Requires the "
+            "optional 'distributed' package."
+        ),
+    )
+    process.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the journal of previous runs and process everything again.",
+    )
+    process.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Extra attempts for units failing due to I/O errors (e.g., downloads).",
+    )
+    process.add_argument(
+        "--retry-delay",
+        type=float,
+        default=5.0,
+        help="Seconds to wait before the first retry, doubled after each attempt.",
+    )
+    process.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report per-stage timings and save them to the output folder.",
+    )
+
+    serve = subparsers.add_parser(
+        "serve", help="Run a warm local worker for parse and query jobs."
+    )
+    serve.add_argument(
+        "--address",
+        default="127.0.0.1:8765",
+        help="Localhost 'host:port' or 'unix:/path/to/socket' to listen on.",
+    )
+    serve.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path(".cache/ec_jrc_idees"),
+        help="Folder for downloaded files.",
+    )
+    serve.add_argument("--store", type=Path, help="SQLite database for queries.")
+    serve.add_argument(
+        "--max-files",
+        type=int,
+        default=16,
+        help="Number of parsed files kept in memory.",
+    )
+
+    combine = subparsers.add_parser(
+        "combine",
+        help="Concatenate processed countries and versions into one file per section.",
+    )
+    combine.add_argument("input_dir", type=Path, help="Output folder of 'process'.")
+    combine.add_argument("output_dir", type=Path, help="Folder for combined files.")
+    combine.add_argument(
+        "--format",
+        dest="fmt",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="File format of inputs and outputs.",
+    )
+    return parser
+
+
+def get_options(args: argparse.Namespace) -> Options:
+    """Get the settings shared by all work units of a run."""
+    utils.ParserOptions(layout=args.layout, backend=args.backend).check()
+    return Options(
+        sectors=args.sectors,
+        sheets=args.sheets,
+        sections=args.sections,
+        layout=args.layout,
+        backend=args.backend,
+        output_dir=args.output_dir,
+        fmt=args.fmt,
+        cache_dir=args.cache_dir,
+        cache=args.cache,
+        store=args.store,
+        unit_system=args.unit_system,
+        value_dtype=args.value_dtype,
+        year_dtype=args.year_dtype,
+    )
+
+
+def get_work_units(args: argparse.Namespace) -> list[WorkUnit]:
+    """Get the work units of a run, rejecting invalid selections before any work."""
+    for sector in args.sectors:
+        utils.get_selection(
+            EasyIDEES.get_sector_config(sector), args.sheets, args.sections
+        )
+    units = []
+    for version in args.versions:
+        valid_countries = EasyIDEES(version).config["countries"]
+        countries = valid_countries if args.countries is None else args.countries
+        invalid = set(countries) - set(valid_countries)
+        if invalid:
+            raise ValueError(f"Invalid countries for version {version}: {invalid}.")
+        units += [
+            WorkUnit(version, country, sector)
+            for country in countries
+            for sector in args.sectors
+        ]
+    return units
+
+
+def run_process(args: argparse.Namespace) -> list[Outcome]:
+    """Process all requested versions and countries.
+
+    Units already finished according to the journal of the output folder are
+    skipped. Returns the units that failed.
+    """
+    if args.jobs < 1:
+        raise ValueError("The number of jobs must be at least 1.")
+    if args.retries < 0:
+        raise ValueError("The number of retries must not be negative.")
+    options = get_options(args)
+    units = get_work_units(args)
+    journal_path = args.output_dir / "journal.jsonl"
+    if args.restart:
+        journal_path.unlink(missing_ok=True)
+    journal = Journal(journal_path, options.get_fingerprint())
+    policy = RetryPolicy(max_attempts=args.retries + 1, delay=args.retry_delay)
+
+    if args.scheduler is not None:
+        return run_graph(args, units, options, journal, policy)
+
+    start = time.perf_counter()
+    timings: list[Timing] = []
+    failed: list[Outcome] = []
+    worker = partial(process_unit, options=options)
+    for outcome in run_batch(units, worker, journal, policy, args.jobs):
+        if outcome.status == "done":
+            unit_timings, failed_checks = outcome.result
+            timings += unit_timings
+            report_checks(outcome.unit, failed_checks)
+        else:
+            failed.append(outcome)
+            report_failure(outcome)
+
+    if args.profile:
+        report = summarise_timings(timings)
+        print(report.to_string(), file=sys.stderr)
+        print(f"wall time: {time.perf_counter() - start:.2f} s", file=sys.stderr)
+        utils.write_dataframe(
+            pd.DataFrame(timings, columns=list(Timing._fields)),
+            args.output_dir / "profile.csv",
+            "csv",
+        )
+    return failed
+
+
+def run_graph(
+    args: argparse.Namespace,
+    units: list[WorkUnit],
+    options: Options,
+    journal: Journal,
+    policy: RetryPolicy,
+) -> list[Outcome]:
+    """Process work units as a task graph on a Dask scheduler.
+
+    Outputs, journaling and retries work as in sequential runs: outcomes are
+    recorded as soon as their tasks finish. Sections are also combined into one
+    file per version (see `graph.combine_task`).
+    Returns the units that failed.
+    """
+    from distributed import as_completed
+
+    from ec_jrc_idees import graph
+
+    if options.store is not None:
+        raise ValueError("Stores are not supported when using a scheduler.")
+    if args.profile:
+        raise ValueError("Profiling is not supported when using a scheduler.")
+    task_graph, keys, combined = graph.build_graph(
+        journal.get_pending(units), options, policy
+    )
+    failed = []
+    with graph.get_dask_client(args.scheduler, args.jobs) as client:
+        futures = client.get(task_graph, [*keys, *combined], sync=False)
+        unit_futures = set(futures[: len(keys)])
+        for future in as_completed(futures):
+            result = future.result()
+            if future not in unit_futures:
+                continue
+            journal.record(result)
+            if result.status == "done":
+                report_checks(result.unit, result.result.failed_checks)
+            else:
+                failed.append(result)
+                report_failure(result)
+    return failed
+
+
+def report_failure(outcome: Outcome) -> None:
+    """Tell users about a failed work unit."""
+    print(
+        f"failed {'/'.join(map(str, outcome.unit))}: {outcome.error}", file=sys.stderr
+    )
+
+
+def report_checks(unit: WorkUnit, failed_checks: list[str]) -> None:
+    """Tell users about failed checks of a work unit, if any."""
+    if failed_checks:
+        print(
+            f"checks failed for {'/'.join(map(str, unit))}: {failed_checks}",
+            file=sys.stderr,
+        )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the command-line interface."""
+    args = get_argument_parser().parse_args(argv)
+    match args.command:
+        case "process":
+            failed = run_process(args)
+            if failed:
+                sys.exit(f"{len(failed)} work unit(s) failed, rerun to retry them.")
+        case "serve":
+            from ec_jrc_idees import service
+
+            worker = service.IDEESService(args.cache_dir, args.store, args.max_files)
+            with service.create_server(args.address, worker) as server:
+                print(f"serving on {args.address}", file=sys.stderr)
+                server.serve_forever()
+        case "combine":
+            from ec_jrc_idees import polars_backend
+
+            polars_backend.combine_outputs(args.input_dir, args.output_dir, args.fmt)
@@ -1,15 +1,18 @@
 """Generic classes to help with IDEES parsing."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator, Mapping
 from math import isclose
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
+import numpy as np
 import pandas as pd
 from pandera import Check, Column, DataFrameSchema, Index
 from styleframe import StyleFrame
 
 from ec_jrc_idees import utils
+from ec_jrc_idees.units import get_conversion
 from ec_jrc_idees.utils import Metadata
 
 STYLE_FEATURES = Literal[
@@ -17,21 +20,54 @@ STYLE_FEATURES = Literal[
 ]
 
 
+class LazyMapping(Mapping):
+    """Read-only mapping that computes and caches each value on first access."""
+
+    def __init__(self, keys: Iterable[str], loader: Callable[[str], Any]) -> None:
+        self._keys: list[str] = list(keys)
+        self._loader = loader
+        self._cache: dict[str, Any] = {}
+
+    def __getitem__(self, key: str):
+        """Get a value, computing it if necessary."""
+        if key not in self._keys:
+            raise KeyError(key)
+        if key not in self._cache:
+            self._cache[key] = self._loader(key)
+        return self._cache[key]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over keys without computing values."""
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        """Get the number of keys."""
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        """Show keys and which of them were computed."""
+        return f"{type(self).__name__}(keys={self._keys}, loaded={list(self._cache)})"
+
+
 class IDEESSection:
     """Generic IDEES section within a sheet."""
 
     EXCEL_ROW_RANGE: tuple[int, int]
     VALID_VERSIONS: tuple[int, ...]
 
-    def __init__(self, dirty_sheet: pd.DataFrame, style: StyleFrame, cnf: dict) -> None:
+    def __init__(self, sheet: "IDEESSheet", cnf: dict) -> None:
         self.cnf: dict[str, dict] = cnf
-        self.style: StyleFrame = style
-        # Do a bit of pre-cleaning to make processing easier.
-        self.dirty_df = (
-            dirty_sheet.loc[self.get_excel_slice(self.EXCEL_ROW_RANGE)]
-            .dropna(how="all", axis="columns")
-            .drop("Code", axis="columns", errors="ignore")
+        self.style: StyleFrame = sheet.style
+        self.options: utils.ParserOptions = sheet.options
+        # Sections are views of the sheet: no data is copied until tidy assembly.
+        excel_slice = self.get_excel_slice(self.EXCEL_ROW_RANGE)
+        rows = sheet.dirty_sheet.index.slice_indexer(
+            excel_slice.start, excel_slice.stop
         )
+        self.dirty_text: pd.Series = sheet.dirty_sheet.iloc[rows, 0]
+        self.years: pd.Index = sheet.years
+        self.values: np.ndarray = sheet.year_values[rows]
+        self.non_numeric: np.ndarray = sheet.non_numeric[rows]
         # Standard features to prepare
         self.annual_df: pd.DataFrame
         self.idees_text: pd.Series
@@ -62,32 +98,65 @@ class IDEESSection:
         """Run tailored checks for this section."""
 
     def prettify(self) -> None:
-        """Rename and standardise stuff, if necessary."""
+        """Rename and standardise stuff, if necessary.
+
+        In the long layout, years are melted into their own column.
+        In the wide layout, years are kept as a block of numeric columns and the
+        variable name is stored as the name of the column index.
+        The polars backend only supports the long layout.
+        If a unit system is requested, values are converted to it.
+        Values and years are cast to the requested data types, without inference.
+        """
         units = self.cnf["units"].get("tidy")
         if not units:
             units = utils.standardize_unit(self.cnf["units"]["idees"])
         assert units, "Units cannot be empty."
-        self.tidy_df = pd.melt(
-            self.tidy_df,
-            id_vars=list(self.cnf["template_columns"].keys()),
-            value_vars=self.annual_df.columns.to_list(),
-            var_name="year",
-            value_name=f"{self.cnf['variable']} [{units}]",
-        )
-        # The cleaning should've made object inferring easy.
-        self.tidy_df = self.tidy_df.infer_objects()
+        template_columns = list(self.cnf["template_columns"].keys())
+        years = self.annual_df.columns.to_list()
+        if self.options.unit_system is not None:
+            factor, units = get_conversion(units, self.options.unit_system)
+            if factor != 1:
+                self.tidy_df[years] = self.tidy_df[years].to_numpy() * factor
+        value_name = f"{self.cnf['variable']} [{units}]"
+        match self.options.backend, self.options.layout:
+            case "pandas", "long":
+                self.tidy_df = pd.melt(
+                    self.tidy_df,
+                    id_vars=template_columns,
+                    value_vars=years,
+                    var_name="year",
+                    value_name=value_name,
+                ).astype(
+                    {
+                        "year": self.options.year_dtype,
+                        value_name: self.options.value_dtype,
+                    }
+                )
+            case "pandas", "wide":
+                self.tidy_df = self.tidy_df.astype(
+                    dict.fromkeys(years, self.options.value_dtype)
+                )
+                self.tidy_df.columns.name = value_name
+            case "polars", "long":
+                from ec_jrc_idees import polars_backend
+
+                self.tidy_df = polars_backend.prettify_section(
+                    self.tidy_df, template_columns, value_name, self.options
+                )
+            case _:
+                raise ValueError(f"Unsupported parser options: {self.options}.")
 
     def get_excel_slice(self, excel_rows: tuple[int, int]):
         """Get a dataframe section based on excel numbers."""
         return slice(excel_rows[0] - 2, excel_rows[1] - 2)
 
-    def find_subsection(
+    def find_subsections(
         self,
-        row: int,
+        rows: pd.Index,
         subsections: pd.Series,
         find: Literal["value", "index"] = "value",
-    ) -> str:
-        """Find subsection a row belongs to.
+    ) -> np.ndarray:
+        """Find the subsections that rows belong to.
 
         This function requires `subsections` to have the following setup:
         - `subsections.index`: the row in `self.data` were a section starts.
@@ -100,16 +169,15 @@ class IDEESSection:
 
         Values lower than the first subsection are considered invalid!
         """
-        if row < subsections.index.min():
+        if not rows.isin(self.annual_df.index).all():
+            raise ValueError("Requested rows not in section data.")
+        subsections = subsections.sort_index()
+        position = np.searchsorted(subsections.index, rows, side="right") - 1
+        if (position < 0).any():
             raise ValueError("Requested row located before the first section.")
-        if row not in self.dirty_df.index:
-            raise ValueError("Requested row not in section data.")
-        n_idx = subsections.index.to_numpy()
-        idx = n_idx[n_idx <= row].max()
         if find == "value":
-            return subsections[idx]
-        elif find == "index":
-            return idx
+            return subsections.to_numpy()[position]
+        return subsections.index.to_numpy()[position]
 
     def check_subsection(self, columns, aggregate_indexes):
         """Compare results against aggregated data sections.
@@ -131,25 +199,62 @@ class IDEESSection:
         for i, idx in enumerate(aggregate_indexes):
             if idx == aggregate_indexes[-1]:
                 results_sum = self.tidy_df[columns].loc[idx:].sum().sum()
-                data_sum = self.dirty_df[columns].loc[idx].sum()
+                data_sum = self.annual_df.loc[idx, columns].sum()
             else:
                 end = aggregate_indexes[i + 1] - 1  # index before next aggregate row
                 results_sum = self.tidy_df.loc[slice(idx, end), columns].sum().sum()
-                data_sum = self.dirty_df[columns].loc[idx].sum()
+                data_sum = self.annual_df.loc[idx, columns].sum()
             if not isclose(results_sum, data_sum):
                 raise ValueError("Parsing was incorrect!")
 
+    def check_numeric(self, rows: pd.Index):
+        """Reject rows with filled yearly cells that are not numbers.
+
+        Such cells are read as missing values, so they must be checked explicitly.
+        """
+        invalid = self.non_numeric[self.dirty_text.index.get_indexer(rows)].any(axis=1)
+        if invalid.any():
+            raise ValueError(f"Non-numeric values in rows: {list(rows[invalid])}.")
+
     def get_idees_text_column(self) -> pd.Series:
         """Get the text column of this section."""
-        idees_text = self.dirty_df.iloc[:, 0]
+        idees_text = self.dirty_text
         if not all(isinstance(i, str) for i in idees_text.to_numpy()):
             raise ValueError("First column should only be string values.")
         return idees_text
 
     def get_annual_dataframe(self) -> pd.DataFrame:
-        """Get yearly data in this section."""
-        annual_df = self.dirty_df.iloc[:, 1:]
-        return annual_df
+        """Get yearly data in this section.
+
+        The result wraps the sheet's numeric block without copying it.
+        Years with no data in this section are removed.
+        """
+        values, years = self.values, self.years
+        has_data = ~np.isnan(values).all(axis=0)
+        if not has_data.all():
+            values, years = values[:, has_data], years[has_data]
+        return pd.DataFrame(
+            values, index=self.dirty_text.index, columns=years, copy=False
+        )
+
+    def build_tidy_dataframe(
+        self, rows: pd.Index, labels: dict[str, np.ndarray | str]
+    ) -> pd.DataFrame:
+        """Assemble tidy data for the given rows, filling template columns with labels.
+
+        This is where yearly data is copied out of the sheet, once.
+        """
+        template = self.cnf["template_columns"] | labels
+        tidy_df = pd.DataFrame(template, index=rows, columns=list(template))
+        if tidy_df.isna().any(axis=None):
+            raise ValueError(f"Template columns not fully filled: {list(template)}.")
+        annual_values = self.annual_df.to_numpy()[
+            self.annual_df.index.get_indexer(rows)
+        ]
+        annual_df = pd.DataFrame(
+            annual_values, index=rows, columns=self.annual_df.columns
+        )
+        return pd.concat([tidy_df, annual_df], axis="columns", copy=False)
 
 
 class IDEESSheet:
@@ -158,13 +263,31 @@ class IDEESSheet:
     SHEET_NAME: str
     SECTION_CLEANERS: list[type[IDEESSection]]
 
-    def __init__(self, excel: pd.ExcelFile, cnf: dict) -> None:
+    def __init__(
+        self,
+        excel: pd.ExcelFile,
+        cnf: dict,
+        options: utils.ParserOptions = utils.ParserOptions(),
+    ) -> None:
         self.dirty_sheet: pd.DataFrame = excel.parse(self.SHEET_NAME)
+        # Convert yearly data to a single numeric block, shared by all sections.
+        is_year = utils.get_year_column_mask(self.dirty_sheet.columns)
+        self.years: pd.Index = self.dirty_sheet.columns[is_year].astype(int)
+        year_block = self.dirty_sheet.loc[:, is_year]
+        numeric_block = year_block.apply(pd.to_numeric, errors="coerce")
+        self.year_values: np.ndarray = np.ascontiguousarray(
+            numeric_block.to_numpy(dtype="float64")
+        )
+        # Filled cells that are not numbers, for sections to reject during checks.
+        self.non_numeric: np.ndarray = (
+            numeric_block.isna() & year_block.notna()
+        ).to_numpy()
         self.style: StyleFrame = StyleFrame.read_excel(
             excel, read_style=True, sheet_name=self.SHEET_NAME
         )
         self.cnf: dict = cnf
-        self.tidy_sections: dict[str, pd.DataFrame] = {}
+        self.options: utils.ParserOptions = options
+        self.tidy_sections: Mapping[str, pd.DataFrame] = {}
         self.metadata: Metadata = utils.get_filename_metadata(str(excel.io))
         self.section_cleaners: dict[str, type[IDEESSection]] = {
             _class.__name__: _class for _class in self.SECTION_CLEANERS
@@ -175,69 +298,120 @@ class IDEESSheet:
         pass
 
     def tidy_up(self) -> None:
-        """Turn all sections in this sheet into machine readable data."""
-        target_sections = self.cnf["sections"]
-        for name, cnf in target_sections.items():
+        """Prepare all configured sections in this sheet for processing.
+
+        Sections are cleaned, checked and prettified on first access.
+        """
+        for name in self.cnf["sections"]:
             if name not in self.section_cleaners:
                 raise ValueError(f"Unable to clean configured section: '{name}'.")
-            section_cleaner = self.section_cleaners[name](
-                self.dirty_sheet, self.style, cnf
-            )
-            section_cleaner.prepare()
-            section_cleaner.tidy_up()
-            section_cleaner.generic_check()
-            section_cleaner.specific_check()
-            section_cleaner.prettify()
-            self.tidy_sections[name] = section_cleaner.tidy_df
-
-    def prettify(self) -> None:
+        self.tidy_sections = LazyMapping(self.cnf["sections"], self.process_section)
+
+    def process_section(self, name: str) -> pd.DataFrame:
+        """Turn a section of this sheet into machine readable data."""
+        section_cleaner = self.section_cleaners[name](self, self.cnf["sections"][name])
+        section_cleaner.prepare()
+        section_cleaner.tidy_up()
+        section_cleaner.generic_check()
+        section_cleaner.specific_check()
+        section_cleaner.prettify()
+        self.check_section(name, section_cleaner.tidy_df)
+        return self.prettify_section(name, section_cleaner.tidy_df)
+
+    def prettify_section(self, name: str, tidy_df: pd.DataFrame) -> pd.DataFrame:
         """Rename and standardise stuff, if necessary."""
         metadata = self.metadata
-        for tidy_df in self.tidy_sections.values():
-            prefixes = {
-                "version": metadata.version,
-                "sector": metadata.file,
-                "country": utils.convert_eu_code_to_alpha3(metadata.country_eurostat),
-            }
-            utils.insert_prefix_columns(tidy_df, prefixes)
+        prefixes = {
+            "version": metadata.version,
+            "sector": metadata.file,
+            "country": utils.convert_eu_code_to_alpha3(metadata.country_eurostat),
+        }
+        if self.options.backend == "polars":
+            from ec_jrc_idees import polars_backend
+
+            return polars_backend.insert_prefix_columns(tidy_df, prefixes)
+        utils.insert_prefix_columns(tidy_df, prefixes)
+        return tidy_df
 
-    def check(self):
-        """Run validation for this sheet.
+    def check_section(self, name: str, tidy_df: pd.DataFrame):
+        """Run validation for a section of this sheet.
 
         By default:
         - Check that template columns are present and in order.
         - Check that that all expected years are present.
+        - Check that years and values have the requested data types.
         """
         expected_years = utils.get_expected_years(self.metadata)
 
-        for name, tidy_df in self.tidy_sections.items():
-            cnf = self.cnf["sections"][name]
-            unit = utils.get_units_in_brackets(tidy_df.columns[-1], brackets="[]")
-            variable_col = f"{cnf['variable']} [{unit}]"
-            template_columns = {name: Column(str) for name in cnf["template_columns"]}
-            data_columns = {
-                "year": Column(int, checks=Check.isin(expected_years)),
-                variable_col: Column(float, nullable=True),
-            }
-            schema = DataFrameSchema(
-                columns=template_columns | data_columns,
-                index=Index(int, unique=True),
-                ordered=True,
-            )
-            schema.validate(tidy_df)
+        cnf = self.cnf["sections"][name]
+        template_columns = {name: Column(str) for name in cnf["template_columns"]}
+        match self.options.backend, self.options.layout:
+            case "polars", "long":
+                from ec_jrc_idees import polars_backend
+
+                polars_backend.check_section(
+                    tidy_df,
+                    list(template_columns),
+                    cnf["variable"],
+                    expected_years,
+                    self.options,
+                )
+                return
+            case "pandas", "long":
+                unit = utils.get_units_in_brackets(tidy_df.columns[-1], brackets="[]")
+                variable_col = f"{cnf['variable']} [{unit}]"
+                data_columns = {
+                    "year": Column(
+                        self.options.year_dtype, checks=Check.isin(expected_years)
+                    ),
+                    variable_col: Column(self.options.value_dtype, nullable=True),
+                }
+            case "pandas", "wide":
+                unit = utils.get_units_in_brackets(tidy_df.columns.name, "[]")
+                if tidy_df.columns.name != f"{cnf['variable']} [{unit}]":
+                    raise ValueError(f"Invalid variable: '{tidy_df.columns.name}'.")
+                years = tidy_df.columns[len(template_columns) :]
+                if set(years) - set(expected_years):
+                    raise ValueError(f"Unexpected years in '{name}': {years}.")
+                data_columns = {
+                    year: Column(self.options.value_dtype, nullable=True)
+                    for year in years
+                }
+            case _:
+                raise ValueError(f"Unsupported parser options: {self.options}.")
+        schema = DataFrameSchema(
+            columns=template_columns | data_columns,
+            index=Index(int, unique=True),
+            ordered=True,
+        )
+        schema.validate(tidy_df)
 
 
 class IDEESFile(ABC):
-    """Generic IDEES file."""
+    """Generic IDEES file.
+
+    `select` limits processing to some sheets and, optionally, their sections
+    (e.g., `{"TrRoad_ene": None, "TrRoad_tech": ["RoadTotalStock"]}`).
+    Keyword arguments are parsing options (see `utils.ParserOptions`).
+    """
 
     SHEET_CLEANERS: list[type[IDEESSheet]]
 
-    def __init__(self, filepath: Path | str, cnf: dict) -> None:
+    def __init__(
+        self,
+        filepath: Path | str,
+        cnf: dict,
+        select: dict[str, list[str] | None] | None = None,
+        **options,
+    ) -> None:
         filepath = Path(filepath)
 
         self.excel: pd.ExcelFile = pd.ExcelFile(filepath)
-        self.cnf: dict = cnf
-        self.tidy_sheets: dict[str, dict[str, pd.DataFrame]] = {}
+        self.cnf: dict = cnf if select is None else utils.select_config(cnf, select)
+        self.options: utils.ParserOptions = utils.ParserOptions(**options)
+        self.options.check()
+        self.tidy_sheets: Mapping[str, Mapping[str, pd.DataFrame]] = {}
+        self.sheets: dict[str, IDEESSheet] = {}
         self.metadata: Metadata = utils.get_filename_metadata(filepath.name)
         self.available_sheets: dict[str, type[IDEESSheet]] = {
             _class.__name__: _class for _class in self.SHEET_CLEANERS
@@ -248,22 +422,44 @@ class IDEESFile(ABC):
         pass
 
     def tidy_up(self) -> None:
-        """Clean all sheets configured for this file."""
-        target_sheets = self.cnf["sheets"]
-        for name, cnf in target_sheets.items():
+        """Prepare all configured sheets in this file for processing.
+
+        Sheets and their sections are processed on first access.
+        """
+        for name in self.cnf["sheets"]:
             if name not in self.available_sheets:
                 raise ValueError(f"Unable to clean configured sheet: '{name}'.")
-            sheet_cleaner = self.available_sheets[name](self.excel, cnf)
-            sheet_cleaner.prepare()
-            sheet_cleaner.tidy_up()
-            sheet_cleaner.check()
-            sheet_cleaner.prettify()
-            self.tidy_sheets[name] = sheet_cleaner.tidy_sections
+        self.tidy_sheets = LazyMapping(self.cnf["sheets"], self.process_sheet)
+
+    def process_sheet(self, name: str) -> Mapping[str, pd.DataFrame]:
+        """Get the harmonized sections of a sheet in this file, processed lazily."""
+        sheet_cleaner = self.available_sheets[name](
+            self.excel, self.cnf["sheets"][name], self.options
+        )
+        sheet_cleaner.prepare()
+        sheet_cleaner.tidy_up()
+        self.sheets[name] = sheet_cleaner
+        return LazyMapping(
+            sheet_cleaner.tidy_sections,
+            lambda section: self.harmonize(sheet_cleaner.tidy_sections[section]),
+        )
+
+    def harmonize(self, tidy_df: pd.DataFrame) -> pd.DataFrame:
+        """Apply configured label renaming and vocabulary validation to tidy data."""
+        remap = self.cnf.get("remap", {})
+        validation = self.cnf.get("validation", {})
+        if not (remap or validation):
+            return tidy_df
+        if self.options.backend == "polars":
+            from ec_jrc_idees import polars_backend
+
+            return polars_backend.harmonize_labels(tidy_df, remap, validation)
+        return utils.harmonize_labels(tidy_df, remap, validation)
 
     def prettify(self) -> None:
         """Rename and standardise stuff, if necessary."""
         pass
 
     @abstractmethod
-    def check(self):
-        """Run validation for this file."""
+    def check(self) -> pd.DataFrame | None:
+        """Run validation for this file, optionally returning a report."""
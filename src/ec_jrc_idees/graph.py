@@ -0,0 +1,188 @@
+"""Batch processing expressed as a task graph, for any compatible scheduler.
+
+Graphs follow the Dask specification: a dictionary of keys to literal values or
+tasks (tuples of a callable and its arguments, where arguments may be other keys).
+They can run with `get_sync` (no extra dependencies) or on any Dask scheduler,
+including distributed clusters (e.g., `distributed.Client.get`).
+
+Each country is fetched once, and its sector files are then tidied and saved in
+the same partitioned layout as sequential runs (see `batch.get_output_path`).
+Once all countries of a version and sector are done, each section is reduced to
+a single file next to its country files (`version/sector/sheet/section.<fmt>`).
+Fetching and processing tasks never raise: like `batch.run_unit`, they return
+the outcome of each unit, so one failing unit does not stop the others.
+"""
+
+from collections.abc import Callable, Hashable, Iterable
+from contextlib import AbstractContextManager
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from ec_jrc_idees import utils
+from ec_jrc_idees.batch import (
+    Options,
+    Outcome,
+    RetryPolicy,
+    WorkUnit,
+    Written,
+    fetch_country,
+    get_output_path,
+    run_unit,
+    tidy_unit,
+    write_unit,
+)
+from ec_jrc_idees.parser import EasyIDEES
+
+SCHEDULER = Callable[[dict, list], Any]
+
+
+def fetch(unit: WorkUnit, options: Options) -> Path:
+    """Get the folder with the files of the country of a work unit."""
+    return fetch_country(
+        EasyIDEES(unit.version), unit.country, options.cache_dir, options.cache
+    )
+
+
+def process(unit: WorkUnit, country_dir: Path, options: Options) -> Written:
+    """Tidy and save all requested sections of a sector file."""
+    return write_unit(unit, *tidy_unit(unit, country_dir, options), options)
+
+
+def fetch_task(unit: WorkUnit, options: Options, policy: RetryPolicy) -> Outcome:
+    """Fetch the files of a country, shared by all its sectors.
+
+    With several nodes, the cache folder must be shared between them.
+    """
+    return run_unit(partial(fetch, options=options), unit, policy)
+
+
+def process_task(
+    unit: WorkUnit, fetched: Outcome, options: Options, policy: RetryPolicy
+) -> Outcome:
+    """Process a sector file, if the files of its country were fetched."""
+    if fetched.status != "done":
+        return fetched._replace(unit=unit)
+    worker = partial(process, country_dir=fetched.result, options=options)
+    return run_unit(worker, unit, policy)
+
+
+def combine_task(
+    pattern: Path, outcomes: list[Outcome], options: Options
+) -> Path | None:
+    """Concatenate the files of all countries of a section into one file.
+
+    Files are found with a glob `pattern` of the country files of the section.
+    Countries saved by earlier runs are included. Nothing is written if no
+    country of this run succeeded. Returns the path of the combined file.
+    """
+    if all(outcome.status != "done" for outcome in outcomes):
+        return None
+    match options.fmt:
+        case "csv":
+            read = pd.read_csv
+        case "parquet":
+            read = pd.read_parquet
+        case _:
+            raise ValueError(f"Invalid output format: '{options.fmt}'.")
+    section_dir = pattern.parent
+    paths = sorted(section_dir.glob(pattern.name))
+    if not paths:
+        return None
+    combined = pd.concat([read(path) for path in paths], ignore_index=True)
+    output_path = section_dir.with_name(f"{section_dir.name}.{options.fmt}")
+    utils.write_dataframe(combined, output_path, options.fmt)
+    return output_path
+
+
+def build_graph(
+    units: Iterable[WorkUnit], options: Options, policy: RetryPolicy = RetryPolicy()
+) -> tuple[dict, list, list]:
+    """Build the task graph of a batch run.
+
+    Returns the graph, the keys of the outcome of each unit and the keys of the
+    combined file of each section.
+    """
+    graph: dict[Hashable, Any] = {}
+    keys = []
+    sectors: dict[tuple[int, str], list] = {}
+    for unit in units:
+        version, country, sector = unit
+        fetch_key = ("fetch", version, country)
+        if fetch_key not in graph:
+            graph[fetch_key] = (fetch_task, unit, options, policy)
+        process_key = ("process", version, country, sector)
+        graph[process_key] = (process_task, unit, fetch_key, options, policy)
+        keys.append(process_key)
+        sectors.setdefault((version, sector), []).append(process_key)
+
+    combined = []
+    for (version, sector), process_keys in sectors.items():
+        cnf = EasyIDEES.get_sector_config(sector)
+        cnf = utils.select_config(
+            cnf, utils.get_selection(cnf, options.sheets, options.sections)
+        )
+        for sheet, sheet_cnf in cnf["sheets"].items():
+            for section in sheet_cnf["sections"]:
+                pattern = get_output_path(
+                    options.output_dir,
+                    utils.Metadata(version, sector, "*"),
+                    sheet,
+                    section,
+                    options.fmt,
+                )
+                combine_key = ("combine", version, sector, sheet, section)
+                graph[combine_key] = (combine_task, pattern, process_keys, options)
+                combined.append(combine_key)
+    return graph, keys, combined
+
+
+def get_sync(graph: dict, keys: list) -> list:
+    """Run a task graph serially in this process."""
+    cache: dict[Hashable, Any] = {}
+
+    def evaluate(arg):
+        if isinstance(arg, list):
+            return [evaluate(item) for item in arg]
+        if isinstance(arg, tuple) and arg and callable(arg[0]):
+            func, *args = arg
+            return func(*(evaluate(item) for item in args))
+        try:
+            is_key = arg in graph
+        except TypeError:  # Unhashable literals (e.g., tuples holding lists).
+            is_key = False
+        if is_key:
+            if arg not in cache:
+                cache[arg] = evaluate(graph[arg])
+            return cache[arg]
+        return arg
+
+    return [evaluate(key) for key in keys]
+
+
+def get_dask_client(address: str, jobs: int = 1) -> AbstractContextManager:
+    """Connect to a Dask scheduler, or start a local cluster if address is 'local'.
+
+    Requires the optional `distributed` dependency.
+    """
+    from distributed import Client
+
+    if address == "local":
+        return Client(n_workers=jobs, threads_per_worker=1)
+    return Client(address)
+
+
+def run_graph(
+    units: Iterable[WorkUnit],
+    options: Options,
+    policy: RetryPolicy = RetryPolicy(),
+    scheduler: SCHEDULER = get_sync,
+) -> list[Outcome]:
+    """Process work units with a scheduler, returning their outcomes.
+
+    Combined section files are written as well.
+    """
+    graph, keys, combined = build_graph(units, options, policy)
+    return list(scheduler(graph, [*keys, *combined]))[: len(keys)]
@@ -1,42 +1,154 @@
 """Easy JRC processing."""
 
 import importlib.resources
+import os
+import shutil
+import tempfile
 import zipfile
+from collections.abc import Mapping
 from pathlib import Path
 
+import pandas as pd
 import requests
 import yaml
 
+from ec_jrc_idees import utils
+from ec_jrc_idees.generics import IDEESFile
+from ec_jrc_idees.store import TidyStore
+from ec_jrc_idees.transport import TransportFile
+
+FILE_CLEANERS: dict[str, type[IDEESFile]] = {"Transport": TransportFile}
+
 
 class EasyIDEES:
     """Easily process JRC-IDEES DATA."""
 
-    def __init__(self, version: str | int) -> None:
+    def __init__(self, version: str | int, store: str | Path | None = None) -> None:
         config_path = importlib.resources.files("ec_jrc_idees") / "config/parser.yaml"
         config = yaml.safe_load(config_path.read_text())
         self.version: int = int(version)
         self.config: dict = config["version_specific"][str(version)] | config["generic"]
+        # Stores are only opened while in use, so no connection is left behind.
+        self.store: Path | None = None if store is None else Path(store)
+        # Validation reports of the last processed file of each sector.
+        self.check_reports: dict[str, pd.DataFrame | None] = {}
+
+    @staticmethod
+    def get_sector_config(sector: str) -> dict:
+        """Get the internal configuration of a sector file (e.g., Transport)."""
+        if sector not in FILE_CLEANERS:
+            raise ValueError(f"Unable to clean requested sector: '{sector}'.")
+        config_path = (
+            importlib.resources.files("ec_jrc_idees") / f"config/{sector}.yaml"
+        )
+        return yaml.safe_load(config_path.read_text())
+
+    def get_filepath(self, country_dir: str | Path, sector: str, country: str) -> Path:
+        """Get the path of a sector file within an unzipped country folder."""
+        return Path(country_dir) / f"JRC-IDEES-{self.version}_{sector}_{country}.xlsx"
 
-    def process_country(self):
-        """Call all parsing functionality."""
-        pass
+    def process_country(
+        self,
+        country: str,
+        country_dir: str | Path,
+        sectors: list[str] | None = None,
+        sheets: list[str] | None = None,
+        sections: list[str] | None = None,
+        **options,
+    ) -> dict[str, Mapping[str, Mapping[str, pd.DataFrame]]]:
+        """Call all parsing functionality.
+
+        Returns the tidy sections of each requested sector, organised per sheet.
+        Optionally, only specific sheets and sections are processed.
+        Extra keyword arguments are passed to the file cleaners (e.g., `layout`).
+        If a store is configured, results are also saved in it.
+        File validation reports are kept in `check_reports`.
+        """
+        if country not in self.config["countries"]:
+            raise ValueError(
+                f"Invalid country for version {self.version}: '{country}'."
+            )
+        sectors = list(FILE_CLEANERS) if sectors is None else sectors
+        results = {}
+        for sector in sectors:
+            cnf = self.get_sector_config(sector)
+            select = utils.get_selection(cnf, sheets, sections)
+            filepath = self.get_filepath(country_dir, sector, country)
+            file_cleaner = FILE_CLEANERS[sector](
+                filepath, cnf, select=select, **options
+            )
+            file_cleaner.prepare()
+            file_cleaner.tidy_up()
+            self.check_reports[sector] = file_cleaner.check()
+            file_cleaner.prettify()
+            results[sector] = file_cleaner.tidy_sheets
+            if self.store is not None:
+                store = TidyStore(self.store)
+                try:
+                    store.add_sheets(file_cleaner.tidy_sheets)
+                finally:
+                    store.close()
+        return results
+
+    def query(
+        self,
+        variable: str | list[str] | None = None,
+        country: str | list[str] | None = None,
+        years: int | list[int] | None = None,
+        **labels: str | list[str],
+    ) -> pd.DataFrame:
+        """Read data of this version from the store (see `TidyStore.query`)."""
+        if self.store is None:
+            raise ValueError("No store configured for querying.")
+        store = TidyStore(self.store)
+        try:
+            return store.query(variable, country, years, self.version, **labels)
+        finally:
+            store.close()
 
     def download_country(self, country: str, zip: str | Path, overwrite: bool = False):
-        """Download a large file from the internet."""
+        """Download a large file from the internet.
+
+        The file is written to a temporary file first and only moved into place
+        once complete, so interrupted downloads leave no partial zip behind.
+        """
         zip = Path(zip)
-        if zip.exists():
-            if not overwrite:
-                raise ValueError("Requested zip file already exists!")
-            zip.unlink()
+        if zip.exists() and not overwrite:
+            raise ValueError("Requested zip file already exists!")
         url = self.config["url"]
         filename = self.config["prefix"] + country + self.config["suffix"]
         response = requests.get(url + filename, stream=True)
-        with open(zip, mode="wb") as file:
-            for chunk in response.iter_content(chunk_size=10 * 1024):
-                file.write(chunk)
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile(
+            dir=zip.parent, prefix=f".{zip.name}", suffix=".part", delete=False
+        ) as file:
+            try:
+                for chunk in response.iter_content(chunk_size=10 * 1024):
+                    file.write(chunk)
+            except BaseException:
+                file.close()
+                Path(file.name).unlink()
+                raise
+        os.replace(file.name, zip)
 
     @staticmethod
     def unzip(zip_path: Path, output_dir: Path):
-        """Unzip a file to a specified location."""
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            zip_ref.extractall(output_dir)
+        """Unzip a file to a specified location.
+
+        Files are extracted to a temporary folder which then replaces the output
+        folder, so interrupted extractions leave no partial folder behind.
+        """
+        output_dir = Path(output_dir)
+        output_dir.parent.mkdir(parents=True, exist_ok=True)
+        temp_dir = Path(
+            tempfile.mkdtemp(dir=output_dir.parent, prefix=f".{output_dir.name}")
+        )
+        try:
+            with zipfile.ZipFile(zip_path, "r") as zip_ref:
+                zip_ref.extractall(temp_dir)
+            if output_dir.exists():
+                shutil.rmtree(output_dir)
+            temp_dir.rename(output_dir)
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
@@ -0,0 +1,146 @@
+"""Polars implementation of the reshaping stages of IDEES parsing.
+
+Requires the optional `polars` dependency.
+Results are equivalent to the pandas path, using polars data types.
+"""
+
+from collections.abc import Iterable
+from pathlib import Path
+
+import pandas as pd
+import polars as pl
+
+from ec_jrc_idees import utils
+
+DTYPES: dict[str, type[pl.DataType]] = {
+    "float64": pl.Float64,
+    "float32": pl.Float32,
+    "int64": pl.Int64,
+    "int16": pl.Int16,
+}
+
+
+def prettify_section(
+    tidy_df: pd.DataFrame,
+    template_columns: list[str],
+    value_name: str,
+    options: utils.ParserOptions = utils.ParserOptions(),
+) -> pl.DataFrame:
+    """Melt the years of a tidy section into a long polars dataframe."""
+    years = [col for col in tidy_df.columns if col not in template_columns]
+    value_dtype = DTYPES[options.value_dtype]
+    data = pl.DataFrame(
+        {col: tidy_df[col].to_numpy() for col in template_columns}
+        | {
+            str(year): tidy_df[year].to_numpy(dtype=options.value_dtype)
+            for year in years
+        },
+        schema={col: pl.String for col in template_columns}
+        | {str(year): value_dtype for year in years},
+    )
+    return data.unpivot(
+        index=template_columns,
+        on=[str(year) for year in years],
+        variable_name="year",
+        value_name=value_name,
+    ).with_columns(pl.col("year").cast(DTYPES[options.year_dtype]))
+
+
+def insert_prefix_columns(data: pl.DataFrame, prefixes: dict) -> pl.DataFrame:
+    """Add columns with default values at the start of a dataframe."""
+    literals = [
+        pl.lit(value, dtype=pl.Int64 if isinstance(value, int) else pl.String).alias(
+            column
+        )
+        for column, value in prefixes.items()
+    ]
+    return data.select(*literals, pl.all())
+
+
+def check_section(
+    data: pl.DataFrame,
+    template_columns: list[str],
+    variable: str,
+    expected_years: list,
+    options: utils.ParserOptions = utils.ParserOptions(),
+):
+    """Validate a long tidy section, mirroring the pandas schema of `IDEESSheet`."""
+    value_col = data.columns[-1]
+    unit = utils.get_units_in_brackets(value_col, brackets="[]")
+    if data.columns != [*template_columns, "year", f"{variable} [{unit}]"]:
+        raise ValueError(f"Invalid columns: {data.columns}.")
+    for col in template_columns:
+        if data.schema[col] != pl.String or data[col].null_count():
+            raise ValueError(f"Column '{col}' must only contain text.")
+    if data.schema["year"] != DTYPES[options.year_dtype]:
+        raise ValueError(f"Column 'year' must be {options.year_dtype}.")
+    if not data["year"].is_in(expected_years).all():
+        raise ValueError("Column 'year' contains unexpected values.")
+    if data.schema[value_col] != DTYPES[options.value_dtype]:
+        raise ValueError(f"Column '{value_col}' must be {options.value_dtype}.")
+
+
+def harmonize_labels(data: pl.DataFrame, remap: dict, validation: dict) -> pl.DataFrame:
+    """Rename labels and check them against the configured vocabularies.
+
+    Polars version of `utils.harmonize_labels`, using enums instead of categoricals.
+    """
+    expected = validation.get("expected", {})
+    vocabularies = expected | validation.get("optional", {})
+    missing = set(expected) - set(data.columns)
+    if missing:
+        raise ValueError(f"Missing expected columns: {missing}.")
+    columns = [col for col in vocabularies if col in data.columns]
+    renamed = data.select(
+        pl.col(col).replace(remap.get(col, {})).alias(col) for col in columns
+    )
+    for col in columns:
+        invalid = renamed[col].filter(~renamed[col].is_in(vocabularies[col])).unique()
+        if not invalid.is_empty():
+            raise ValueError(f"Unexpected labels in '{col}': {invalid.to_list()}.")
+    return data.with_columns(
+        renamed[col].cast(pl.Enum(vocabularies[col])) for col in columns
+    )
+
+
+def concat_lazy(frames: Iterable[pl.DataFrame | pl.LazyFrame]) -> pl.LazyFrame:
+    """Lazily concatenate tidy data (e.g., several countries or versions)."""
+    return pl.concat([frame.lazy() for frame in frames], how="diagonal_relaxed")
+
+
+def scan(path: str | Path, fmt: utils.OUTPUT_FORMATS) -> pl.LazyFrame:
+    """Lazily read a file previously saved by this package."""
+    match fmt:
+        case "csv":
+            return pl.scan_csv(path)
+        case "parquet":
+            return pl.scan_parquet(path)
+        case _:
+            raise ValueError(f"Invalid output format: '{fmt}'.")
+
+
+def sink(data: pl.LazyFrame, path: str | Path, fmt: utils.OUTPUT_FORMATS):
+    """Stream a lazy frame to disk, creating folders if needed."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    match fmt:
+        case "csv":
+            data.sink_csv(path)
+        case "parquet":
+            data.sink_parquet(path)
+        case _:
+            raise ValueError(f"Invalid output format: '{fmt}'.")
+
+
+def combine_outputs(input_dir: Path, output_dir: Path, fmt: utils.OUTPUT_FORMATS):
+    """Concatenate per-country files into one file per section.
+
+    Expects the `version/sector/sheet/section/country` layout of the CLI.
+    """
+    sections: dict[tuple[str, ...], list[Path]] = {}
+    for path in sorted(input_dir.glob(f"*/*/*/*/*.{fmt}")):
+        sector, sheet, section = path.parts[-4:-1]
+        sections.setdefault((sector, sheet, section), []).append(path)
+    for (sector, sheet, section), paths in sections.items():
+        combined = concat_lazy(scan(path, fmt) for path in paths)
+        sink(combined, output_dir / sector / sheet / f"{section}.{fmt}", fmt)
@@ -0,0 +1,355 @@
+"""Long-running local worker that keeps parsing state warm between jobs.
+
+Starting Python, importing the parsing stack and loading configurations often
+takes longer than a small parsing job. The service pays these costs once and
+also keeps recently parsed files in memory, so repeated requests are cheap.
+
+Jobs are sent as JSON over HTTP, either on a localhost port ('127.0.0.1:8765')
+or a Unix socket ('unix:/tmp/ec_jrc_idees.sock'). Tidy data is returned in the
+Arrow IPC stream format. Requires the optional `pyarrow` dependency.
+"""
+
+import http.client
+import ipaddress
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+
+from ec_jrc_idees import utils
+from ec_jrc_idees.batch import fetch_country
+from ec_jrc_idees.generics import IDEESFile
+from ec_jrc_idees.parser import FILE_CLEANERS, EasyIDEES
+from ec_jrc_idees.store import TidyStore
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+UNIX_PREFIX = "unix:"
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+# Wide tidy data stores its variable as the name of the column index.
+VALUE_NAME_KEY = b"ec_jrc_idees:value_name"
+
+
+def to_arrow_bytes(data) -> bytes:
+    """Serialize tidy data (pandas or polars) into an Arrow IPC stream."""
+    import pyarrow as pa
+
+    if isinstance(data, pd.DataFrame):
+        value_name = data.columns.name
+        table = pa.Table.from_pandas(
+            data.set_axis(data.columns.astype(str), axis="columns"),
+            preserve_index=False,
+        )
+        if value_name is not None:
+            table = table.replace_schema_metadata(
+                (table.schema.metadata or {}) | {VALUE_NAME_KEY: value_name.encode()}
+            )
+    else:
+        table = data.to_arrow()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def from_arrow_bytes(payload: bytes) -> pd.DataFrame:
+    """Read tidy data from an Arrow IPC stream into pandas."""
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(payload).read_all()
+    data = table.to_pandas()
+    value_name = (table.schema.metadata or {}).get(VALUE_NAME_KEY)
+    if value_name is not None:
+        years = utils.get_year_column_mask(data.columns)
+        data.columns = [
+            int(col) if is_year else col for col, is_year in zip(data.columns, years)
+        ]
+        data.columns.name = value_name.decode()
+    return data
+
+
+class IDEESService:
+    """Parsing state shared by all jobs of a worker.
+
+    Keeps version and sector configurations, downloaded files and the most
+    recently parsed files (with their lazily cleaned sections) in memory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = ".cache/ec_jrc_idees",
+        store: str | Path | None = None,
+        max_files: int = 16,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.store = None if store is None else Path(store)
+        self.max_files = max_files
+        self.parsers: dict[int, EasyIDEES] = {}
+        self.sector_configs: dict[str, dict] = {}
+        self.files: OrderedDict[tuple, IDEESFile] = OrderedDict()
+        # Cleaners are not thread-safe: jobs are run one at a time.
+        self.lock = threading.Lock()
+
+    def get_parser(self, version: int) -> EasyIDEES:
+        """Get the (cached) parser of a version."""
+        if version not in self.parsers:
+            self.parsers[version] = EasyIDEES(version)
+        return self.parsers[version]
+
+    def get_file(
+        self, version: int, country: str, sector: str, options: utils.ParserOptions
+    ) -> IDEESFile:
+        """Get a prepared file cleaner, re-using recently parsed files."""
+        key = (version, country, sector, options)
+        if key in self.files:
+            self.files.move_to_end(key)
+            return self.files[key]
+        easy = self.get_parser(version)
+        if country not in easy.config["countries"]:
+            raise ValueError(f"Invalid country for version {version}: '{country}'.")
+        if sector not in self.sector_configs:
+            self.sector_configs[sector] = easy.get_sector_config(sector)
+        country_dir = fetch_country(easy, country, self.cache_dir, cache=True)
+        file = FILE_CLEANERS[sector](
+            easy.get_filepath(country_dir, sector, country),
+            self.sector_configs[sector],
+            **options._asdict(),
+        )
+        file.prepare()
+        file.tidy_up()
+        self.files[key] = file
+        if len(self.files) > self.max_files:
+            self.files.popitem(last=False)
+        return file
+
+    def parse(self, job: dict):
+        """Get a tidy section.
+
+        Jobs must specify `version`, `country`, `sheet` and `section`.
+        Optionally, `sector` (default: Transport) and parsing `options`.
+        """
+        options = utils.ParserOptions(**job.get("options", {}))
+        with self.lock:
+            file = self.get_file(
+                int(job["version"]),
+                job["country"],
+                job.get("sector", "Transport"),
+                options,
+            )
+            if job["sheet"] not in file.tidy_sheets:
+                raise ValueError(f"Sheet not available: '{job['sheet']}'.")
+            sections = file.tidy_sheets[job["sheet"]]
+            if job["section"] not in sections:
+                raise ValueError(f"Section not available: '{job['section']}'.")
+            return sections[job["section"]]
+
+    def query(self, job: dict) -> pd.DataFrame:
+        """Read data from the store of the service (see `TidyStore.query`)."""
+        if self.store is None:
+            raise ValueError("No store configured for querying.")
+        # Connections cannot be shared between request threads.
+        store = TidyStore(self.store)
+        try:
+            return store.query(**job)
+        finally:
+            store.close()
+
+    def get_status(self) -> dict:
+        """Describe what is currently kept warm."""
+        return {
+            "versions": list(self.parsers),
+            "sectors": list(self.sector_configs),
+            "files": [
+                {"version": version, "country": country, "sector": sector}
+                | {"options": options._asdict()}
+                for version, country, sector, options in self.files
+            ],
+        }
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Route HTTP requests to the service of the server."""
+
+    server: "ServiceHTTPServer | ServiceUnixServer"
+
+    def do_GET(self) -> None:
+        """Report the status of the service."""
+        if self.path != "/status":
+            self.send_json(404, {"error": f"Unknown path: '{self.path}'."})
+            return
+        self.send_json(200, self.server.service.get_status())
+
+    def do_POST(self) -> None:
+        """Run a parse or query job, returning data as Arrow."""
+        jobs = {
+            "/parse": self.server.service.parse,
+            "/query": self.server.service.query,
+        }
+        if self.path not in jobs:
+            self.send_json(404, {"error": f"Unknown path: '{self.path}'."})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            payload = to_arrow_bytes(jobs[self.path](job))
+        except (ValueError, KeyError, TypeError) as error:
+            self.send_json(400, {"error": f"{type(error).__name__}: {error}"})
+            return
+        except Exception as error:
+            self.send_json(500, {"error": f"{type(error).__name__}: {error}"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ARROW_MIME)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json(self, code: int, content: dict) -> None:
+        """Send a JSON response."""
+        body = json.dumps(content).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        """Identify clients, which have no address on Unix sockets."""
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """HTTP server on a localhost port, holding a warm service."""
+
+    def __init__(self, address: tuple[str, int], service: IDEESService) -> None:
+        super().__init__(address, ServiceHandler)
+        self.service = service
+
+
+class ServiceUnixServer(socketserver.ThreadingUnixStreamServer):
+    """HTTP server on a Unix socket, holding a warm service."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, service: IDEESService) -> None:
+        super().__init__(path, ServiceHandler)
+        self.service = service
+
+
+def create_server(
+    address: str, service: IDEESService
+) -> ServiceHTTPServer | ServiceUnixServer:
+    """Create a server for 'host:port' or 'unix:/path/to/socket' addresses.
+
+    The service has no authentication, so hosts must be loopback addresses.
+    Stale sockets of previous servers are replaced, but no other files.
+    """
+    if address.startswith(UNIX_PREFIX):
+        path = address.removeprefix(UNIX_PREFIX)
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise ValueError(f"Socket path exists and is not a socket: '{path}'.")
+            os.unlink(path)
+        return ServiceUnixServer(path, service)
+    host, port = address.rsplit(":", 1)
+    if not is_loopback(host):
+        raise ValueError(f"Only loopback hosts can be served: '{host}'.")
+    return ServiceHTTPServer((host, int(port)), service)
+
+
+def is_loopback(host: str) -> bool:
+    """Check if a host only resolves to addresses of this machine."""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(info[4][0]).is_loopback for info in infos)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket."""
+
+    def __init__(self, path: str, timeout: float | None = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        """Connect to the socket file instead of a port."""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class IDEESClient:
+    """Thin client of a running service, mirroring `EasyIDEES`.
+
+    Start a service with `ec-jrc-idees serve`.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float = 600) -> None:
+        self.address = address
+        self.timeout = timeout
+
+    def parse(
+        self,
+        version: int,
+        country: str,
+        sheet: str,
+        section: str,
+        sector: str = "Transport",
+        **options,
+    ) -> pd.DataFrame:
+        """Get a tidy section. Keyword arguments are parsing options."""
+        job = {
+            "version": version,
+            "country": country,
+            "sector": sector,
+            "sheet": sheet,
+            "section": section,
+            "options": options,
+        }
+        return from_arrow_bytes(self.request("POST", "/parse", job))
+
+    def query(
+        self,
+        variable: str | list[str] | None = None,
+        country: str | list[str] | None = None,
+        years: int | list[int] | None = None,
+        version: int | list[int] | None = None,
+        **labels: str | list[str],
+    ) -> pd.DataFrame:
+        """Read data from the store of the service (see `TidyStore.query`)."""
+        job = {"variable": variable, "country": country, "years": years}
+        job |= {"version": version} | labels
+        return from_arrow_bytes(self.request("POST", "/query", job))
+
+    def get_status(self) -> dict:
+        """Get what the service currently keeps in memory."""
+        return json.loads(self.request("GET", "/status"))
+
+    def request(self, method: str, path: str, job: dict | None = None) -> bytes:
+        """Send a request to the service, raising errors it reports."""
+        if self.address.startswith(UNIX_PREFIX):
+            connection: http.client.HTTPConnection = UnixHTTPConnection(
+                self.address.removeprefix(UNIX_PREFIX), self.timeout
+            )
+        else:
+            host, port = self.address.rsplit(":", 1)
+            connection = http.client.HTTPConnection(host, int(port), self.timeout)
+        try:
+            body = None if job is None else json.dumps(job).encode()
+            connection.request(method, path, body=body)
+            response = connection.getresponse()
+            payload = response.read()
+        finally:
+            connection.close()
+        if response.status == http.client.BAD_REQUEST:
+            raise ValueError(json.loads(payload)["error"])
+        if response.status != http.client.OK:
+            raise RuntimeError(json.loads(payload)["error"])
+        return payload
@@ -0,0 +1,163 @@
+"""Local indexed storage of tidy data, for fast selective reads."""
+
+import sqlite3
+from collections.abc import Iterable
+from pathlib import Path
+
+import pandas as pd
+
+from ec_jrc_idees import utils
+
+PREFIX_COLUMNS = ["version", "sector", "country"]
+CATALOG_TABLE = "catalog"
+
+
+class TidyStore:
+    """SQLite database holding one indexed table per tidy section.
+
+    A catalog table records the sheet, variable and unit of each section.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Parallel writers wait for each other instead of failing.
+        self.connection = sqlite3.connect(self.path, timeout=600)
+        self.connection.execute(
+            f"""CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+                name TEXT PRIMARY KEY,
+                sheet TEXT NOT NULL,
+                section TEXT NOT NULL,
+                variable TEXT NOT NULL,
+                unit TEXT NOT NULL,
+                template_columns TEXT NOT NULL
+            )"""
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def add_sheets(self, tidy_sheets: dict[str, dict[str, pd.DataFrame]]) -> None:
+        """Store all sections of a processed file."""
+        for sheet, tidy_sections in tidy_sheets.items():
+            for section, tidy_df in tidy_sections.items():
+                self.add_section(sheet, section, tidy_df)
+
+    def add_section(self, sheet: str, section: str, tidy_df) -> None:
+        """Store a tidy section, replacing previous data of its version and country.
+
+        Accepts data in any layout or backend.
+        """
+        data = utils.to_long_dataframe(tidy_df)
+        value_col = data.columns[-1]
+        variable = value_col.split("[")[0].strip()
+        unit = utils.get_units_in_brackets(value_col, brackets="[]")
+        template = [col for col in data.columns[:-2] if col not in PREFIX_COLUMNS]
+        if list(data.columns) != [*PREFIX_COLUMNS, *template, "year", value_col]:
+            raise ValueError(f"Unexpected columns in '{section}': {data.columns}.")
+        name = f"{data['sector'].iloc[0]}_{section}"
+
+        with self.connection:
+            self._create_table(name, template)
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {CATALOG_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+                (name, sheet, section, variable, unit, ",".join(template)),
+            )
+            for (version, country), _ in data.groupby(["version", "country"]):
+                self.connection.execute(
+                    f'DELETE FROM "{name}" WHERE version = ? AND country = ?',
+                    (int(version), country),
+                )
+            data.set_axis([*data.columns[:-1], "value"], axis="columns").to_sql(
+                name, self.connection, if_exists="append", index=False
+            )
+
+    def get_catalog(self) -> pd.DataFrame:
+        """Get the description of all stored sections."""
+        return pd.read_sql(f"SELECT * FROM {CATALOG_TABLE}", self.connection)
+
+    def query(
+        self,
+        variable: str | Iterable[str] | None = None,
+        country: str | Iterable[str] | None = None,
+        years: int | Iterable[int] | None = None,
+        version: int | Iterable[int] | None = None,
+        **labels: str | Iterable[str],
+    ) -> pd.DataFrame:
+        """Select stored data.
+
+        Filters accept single values or collections. Countries can be given as
+        ISO 3166 alpha 3 or Eurostat codes. Extra keyword arguments filter
+        template columns (e.g., `vehicle_type="Passenger cars"`).
+        Sections lacking a filtered template column are skipped.
+        Results have the template columns of all sections of the selected
+        variables, even if no data matches the other filters.
+        """
+        catalog = self.get_catalog()
+        if variable is not None:
+            catalog = catalog[catalog["variable"].isin(_as_list(variable))]
+        templates = catalog["template_columns"].str.split(",")
+        all_template = list(dict.fromkeys(col for cols in templates for col in cols))
+        columns = [*PREFIX_COLUMNS, "variable", *all_template]
+        columns += ["year", "value", "unit"]
+        if country is not None:
+            country = [
+                utils.convert_eu_code_to_alpha3(code)
+                if len(code) == utils.EU_CODE_LENGTH
+                else code
+                for code in _as_list(country)
+            ]
+        filters = {"country": country, "year": years, "version": version} | labels
+
+        results = []
+        for entry in catalog.itertuples(index=False):
+            template = entry.template_columns.split(",")
+            if set(labels) - set(template):
+                continue
+            conditions, parameters = [], []
+            for column, selected in filters.items():
+                if selected is None:
+                    continue
+                values = _as_list(selected)
+                conditions.append(f'"{column}" IN ({", ".join("?" * len(values))})')
+                parameters += values
+            sql = f'SELECT * FROM "{entry.name}"'
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            data = pd.read_sql(sql, self.connection, params=parameters)
+            data.insert(len(PREFIX_COLUMNS), "variable", entry.variable)
+            data.insert(len(data.columns), "unit", entry.unit)
+            results.append(data)
+        if not results:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(results, ignore_index=True).reindex(columns=columns)
+
+    def _create_table(self, name: str, template: list[str]) -> None:
+        """Create an indexed section table, if necessary."""
+        columns = ", ".join(f'"{col}" TEXT NOT NULL' for col in template)
+        self.connection.execute(
+            f"""CREATE TABLE IF NOT EXISTS "{name}" (
+                version INTEGER NOT NULL,
+                sector TEXT NOT NULL,
+                country TEXT NOT NULL,
+                {columns},
+                year INTEGER NOT NULL,
+                value REAL
+            )"""
+        )
+        self.connection.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}_prefix" '
+            f'ON "{name}" (country, year, version)'
+        )
+        for col in template:
+            self.connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{name}_{col}" ON "{name}" ("{col}")'
+            )
+
+
+def _as_list(values) -> list:
+    """Turn filter values into a list of plain python objects."""
+    if isinstance(values, str) or not isinstance(values, Iterable):
+        values = [values]
+    return [value.item() if hasattr(value, "item") else value for value in values]
@@ -2,11 +2,13 @@
 
 from typing import NamedTuple, override  # type: ignore
 
+import numpy as np
 import pandas as pd
 from styleframe import StyleFrame
 
 from ec_jrc_idees import utils
 from ec_jrc_idees.generics import IDEESFile, IDEESSection, IDEESSheet
+from ec_jrc_idees.units import get_factor
 
 TOTAL_INDENT = 0
 CATEGORY_INDENT = 1
@@ -66,8 +68,24 @@ def get_vehicle_subtype_aggregates(idees_text: pd.Series, style: StyleFrame):
 class RoadSection(IDEESSection):
     """Adds generic calculations specific to Road transport."""
 
+    def get_tidy_rows(self) -> pd.Index:
+        """Get rows with technology specific data.
+
+        Aggregate rows unrelated to tech types are skipped.
+        Vehicle type aggregates are also skipped, except for two-wheelers.
+        """
+        total_aggr = get_total_aggregates(self.idees_text, self.style)
+        categories = get_category_aggregates(self.idees_text, self.style)
+        vehicle_types = get_vehicle_type_aggregates(self.idees_text, self.style)
+        two_wheel = vehicle_types.str.contains("|".join(TWO_WHEEL_TEXT))
+        skipped = total_aggr.index.union(categories.index).union(
+            vehicle_types[~two_wheel].index
+        )
+        return self.annual_df.index.difference(skipped)
+
     @override
     def specific_check(self):
+        self.check_numeric(self.tidy_df.index)
         years = self.annual_df.columns
         aggregates = [
             get_total_aggregates(self.idees_text, self.style),
@@ -83,41 +101,20 @@ class RoadSectionNoCarriers(RoadSection):
 
     @override
     def tidy_up(self):
-        years = self.annual_df.columns
-
-        # Build a template row to add data to
-        template = pd.Series(self.cnf["template_columns"])
-        template = pd.concat([template, pd.Series(None, index=years)])
-
         # Get aggregate sections
-        total_aggr = get_total_aggregates(self.idees_text, self.style)
         categories = get_category_aggregates(self.idees_text, self.style)
         vehicle_types, vehicle_subtypes = get_vehicle_subtype_aggregates(
             self.idees_text, self.style
         )
 
-        tidy_df = pd.DataFrame(columns=template.index)
-        for row in self.annual_df.index:
-            entry = template.copy()
-            if row in total_aggr or row in categories:
-                # Aggregate rows unrelated to tech types should be skipped.
-                continue
-            if row in vehicle_types and not any(
-                [i in vehicle_types[row] for i in TWO_WHEEL_TEXT]
-            ):
-                # Vehicle type aggregates should also be skipped, except two-wheelers.
-                continue
-
-            # Identify the characteristics of this row.
-            entry[years] = self.annual_df.loc[row]
-            entry["category"] = self.find_subsection(row, categories)
-            entry["vehicle_type"] = self.find_subsection(row, vehicle_types)
-            entry["vehicle_subtype"] = self.find_subsection(row, vehicle_subtypes)
-
-            if None in entry:
-                raise ValueError(f"Entry not fully filled: {entry}")
-            tidy_df.loc[row] = entry
-        self.tidy_df = tidy_df
+        # Identify the characteristics of each row.
+        rows = self.get_tidy_rows()
+        labels = {
+            "category": self.find_subsections(rows, categories),
+            "vehicle_type": self.find_subsections(rows, vehicle_types),
+            "vehicle_subtype": self.find_subsections(rows, vehicle_subtypes),
+        }
+        self.tidy_df = self.build_tidy_dataframe(rows, labels)
 
 
 class RoadSectionNoCarrierNoAggregates(RoadSectionNoCarriers):
@@ -128,8 +125,7 @@ class RoadSectionNoCarrierNoAggregates(RoadSectionNoCarriers):
         # Sections with ratios or rates have no aggregates for testing.
         # Instead, rely on their matching shape with other sections and
         # check that all gathered values can be interpreted as numeric.
-        years = self.annual_df.columns
-        self.tidy_df[years].apply(lambda x: pd.to_numeric(x, errors="raise"))
+        self.check_numeric(self.tidy_df.index)
 
 
 class RoadVKM(RoadSectionNoCarriers):
@@ -149,70 +145,48 @@ class RoadEnergyConsumption(RoadSection):
     def tidy_up(self):
         years = self.annual_df.columns
 
-        # Build a template row to add data to
-        template = pd.Series(self.cnf["template_columns"])
-        template = pd.concat([template, pd.Series(None, index=years)])
-
         # Get aggregated sections
-        total_aggr = get_total_aggregates(self.idees_text, self.style)
         categories = get_category_aggregates(self.idees_text, self.style)
         vehicle_types, vehicle_subtypes = get_vehicle_subtype_aggregates(
             self.idees_text, self.style
         )
-        carriers = self._find_carriers(vehicle_subtypes)
+        carriers = pd.Series(
+            utils.match_rules(vehicle_subtypes, self.cnf["carriers"], "carrier"),
+            index=vehicle_subtypes.index,
+        )
 
         of_which = self.idees_text.loc[self.idees_text.str.contains("of which")]
         if set(of_which.index) & set(carriers.index):
             raise ValueError("Carriers and 'of which' compliments must not overlap.")
 
-        tidy_df = pd.DataFrame(columns=template.index)
-        for row in self.annual_df.index:
-            entry = template.copy()
-            # Aggregated rows should be skipped, except for special cases.
-            if row in total_aggr or row in categories:
-                continue
-            if row in vehicle_types and not any(
-                [i in vehicle_types[row] for i in TWO_WHEEL_TEXT]
-            ):
-                continue
-
-            entry[years] = self.annual_df.loc[row]
-            entry["category"] = self.find_subsection(row, categories)
-            entry["vehicle_type"] = self.find_subsection(row, vehicle_types)
-            entry["vehicle_subtype"] = self.find_subsection(row, vehicle_subtypes)
-            entry["carrier"] = self.find_subsection(row, carriers)
-            if row in of_which:
-                if "bio" in of_which[row]:
-                    entry["carrier"] = "Bio" + entry["carrier"]
-                elif "electricity" in of_which[row]:
-                    entry["carrier"] = "Electricity"
-                else:
-                    raise ValueError("Could not identify carrier.")
-                carrier_idx = self.find_subsection(row, carriers, find="index")
-                tidy_df.loc[carrier_idx, years] -= entry[years]
-            if None in entry:
-                raise ValueError(f"Entry not fully filled: {entry}.")
-            tidy_df.loc[row] = entry
-        self.tidy_df = tidy_df
+        # Identify the characteristics of each row.
+        rows = self.get_tidy_rows()
+        labels = {
+            "category": self.find_subsections(rows, categories),
+            "vehicle_type": self.find_subsections(rows, vehicle_types),
+            "vehicle_subtype": self.find_subsections(rows, vehicle_subtypes),
+            "carrier": self.find_subsections(rows, carriers),
+        }
+
+        # 'of which' rows are removed from their parent carrier.
+        of_which_pos = rows.get_indexer(of_which.index)
+        if (of_which_pos < 0).any():
+            raise ValueError("'of which' compliments must be part of the tidy data.")
+        parent_carriers = labels["carrier"][of_which_pos]
+        templates = utils.match_rules(of_which, self.cnf["of_which"], "carrier")
+        labels["carrier"][of_which_pos] = [
+            template.format(carrier=carrier)
+            for template, carrier in zip(templates, parent_carriers)
+        ]
+        tidy_df = self.build_tidy_dataframe(rows, labels)
 
-    @staticmethod
-    def _find_carriers(vehicle_subtypes: pd.Series) -> pd.Series:
-        carriers = pd.Series(index=vehicle_subtypes.index, dtype="object")
-        for idx in carriers.index:
-            subtype = vehicle_subtypes[idx]
-            if "Gasoline" in subtype or "Plug-in" in subtype:
-                carriers[idx] = "Gasoline"
-            elif any([i in subtype for i in ["Diesel", "Domestic", "International"]]):
-                carriers[idx] = "Diesel"
-            elif "LPG" in subtype:
-                carriers[idx] = "LPG"
-            elif "Battery" in subtype:
-                carriers[idx] = "Electricity"
-            elif "Natural gas" in subtype:
-                carriers[idx] = "Natural gas"
-            else:
-                raise ValueError(f"Could not identify carrier for '{subtype}'.")
-        return carriers
+        values = tidy_df[years].to_numpy(copy=True)
+        parent_pos = rows.get_indexer(
+            self.find_subsections(of_which.index, carriers, find="index")
+        )
+        np.subtract.at(values, parent_pos, values[of_which_pos])
+        tidy_df[years] = values
+        self.tidy_df = tidy_df
 
 
 class RoadTotalStock(RoadSectionNoCarriers):
@@ -281,8 +255,144 @@ class TransportFile(IDEESFile):
     """Processing of Road transport data."""
 
     SHEET_CLEANERS = [TrRoad_act, TrRoad_ene, TrRoad_tech]
+    # Sections needed by each cross-sheet check.
+    CHECK_SECTIONS = {
+        "vkm_stock_keys": {"TrRoad_act": "RoadVKM", "TrRoad_tech": "RoadTotalStock"},
+        "energy_per_vkm": {
+            "TrRoad_ene": "RoadEnergyConsumption",
+            "TrRoad_act": "RoadVKM",
+            "TrRoad_tech": "RoadTotalStockTestEfficiency",
+        },
+        "energy_totals": {"TrRoad_ene": "RoadEnergyConsumption"},
+    }
 
     @override
-    def check(self):
-        # TODO: add checks once all transport files are processed.
-        pass
+    def check(self) -> pd.DataFrame:
+        """Run cross-sheet consistency checks, returning a report.
+
+        The report has the status and number of failing rows of each check, with
+        the same version, sector and country labels as tidy data.
+        Checks are skipped if their sections were not selected for processing.
+        """
+        checks = {
+            "vkm_stock_keys": self.check_vkm_stock_keys,
+            "energy_per_vkm": self.check_energy_per_vkm,
+            "energy_totals": self.check_energy_totals,
+        }
+        records = []
+        for name, check in checks.items():
+            available = all(
+                section in self.cnf["sheets"].get(sheet, {}).get("sections", {})
+                for sheet, section in self.CHECK_SECTIONS[name].items()
+            )
+            if available:
+                failures = check()
+                status = "passed" if failures == 0 else "failed"
+            else:
+                failures, status = 0, "skipped"
+            records.append((name, status, failures))
+        report = pd.DataFrame(records, columns=["check", "status", "failures"])
+        utils.insert_prefix_columns(
+            report,
+            {
+                "version": self.metadata.version,
+                "sector": self.metadata.file,
+                "country": utils.convert_eu_code_to_alpha3(
+                    self.metadata.country_eurostat
+                ),
+            },
+        )
+        return report
+
+    def check_vkm_stock_keys(self) -> int:
+        """Count vehicles present in only one of RoadVKM and RoadTotalStock."""
+        keys = self.get_template_columns("TrRoad_act", "RoadVKM")
+        vkm = self.get_values("TrRoad_act", "RoadVKM", "mio km")
+        stock = self.get_values("TrRoad_tech", "RoadTotalStock", "vehicles")
+        merged = (
+            vkm[keys]
+            .drop_duplicates()
+            .merge(stock[keys].drop_duplicates(), on=keys, how="outer", indicator=True)
+        )
+        return int((merged["_merge"] != "both").sum())
+
+    def check_energy_per_vkm(self) -> int:
+        """Count implausible real-world energy intensities.
+
+        Energy per vkm must stay within configured bounds of the test efficiency
+        of the stock times its discrepancy ratio (if the latter is available).
+        """
+        keys = [*self.get_template_columns("TrRoad_act", "RoadVKM"), "year"]
+        energy = (
+            self.get_values("TrRoad_ene", "RoadEnergyConsumption", "ktoe")
+            .groupby(keys, observed=True, as_index=False)["value"]
+            .sum(min_count=1)
+        )
+        data = energy.merge(
+            self.get_values("TrRoad_act", "RoadVKM", "mio km"),
+            on=keys,
+            suffixes=("_energy", "_vkm"),
+        ).merge(
+            self.get_values(
+                "TrRoad_tech", "RoadTotalStockTestEfficiency", "kgoe/100 km"
+            ).rename(columns={"value": "value_efficiency"}),
+            on=keys,
+        )
+        expected = data["value_efficiency"].to_numpy()
+        tech_sections = self.cnf["sheets"]["TrRoad_tech"]["sections"]
+        if "RoadTotalStockTestDiscrepancy" in tech_sections:
+            discrepancy = self.get_values(
+                "TrRoad_tech", "RoadTotalStockTestDiscrepancy", "ratio"
+            )
+            expected = expected * data[keys].merge(discrepancy, on=keys, how="left")[
+                "value"
+            ].to_numpy(dtype="float64", na_value=np.nan)
+        # ktoe / million km = kgoe / km
+        actual = data["value_energy"].to_numpy() / data["value_vkm"].to_numpy() * 100
+        low, high = self.cnf["checks"]["energy_per_vkm_bounds"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = actual / expected
+        valid = np.isfinite(ratio) & (expected > 0)
+        return int((valid & ((ratio < low) | (ratio > high))).sum())
+
+    def check_energy_totals(self) -> int:
+        """Count years where tidy energy does not add up to the IDEES total."""
+        energy = self.get_values("TrRoad_ene", "RoadEnergyConsumption", "ktoe")
+        tidy_total = energy.groupby("year")["value"].sum()
+        idees_total = self.get_idees_energy_total()
+        tidy_total = tidy_total.reindex(idees_total.index.astype("int64"))
+        matches = np.isclose(
+            tidy_total.to_numpy(),
+            idees_total.to_numpy(),
+            rtol=self.cnf["checks"]["rtol"],
+            equal_nan=True,
+        )
+        return int((~matches).sum())
+
+    def get_idees_energy_total(self) -> pd.Series:
+        """Get the total road energy consumption row of the file, per year."""
+        sheet = self.sheets["TrRoad_ene"]
+        section = RoadEnergyConsumption(
+            sheet, sheet.cnf["sections"]["RoadEnergyConsumption"]
+        )
+        section.prepare()
+        total_row = get_total_aggregates(section.idees_text, section.style)
+        if len(total_row) != 1:
+            raise ValueError("Expected a single total energy consumption row.")
+        return section.annual_df.loc[total_row.index[0]]
+
+    def get_template_columns(self, sheet: str, section: str) -> list[str]:
+        """Get the labels identifying the rows of a section."""
+        return list(self.cnf["sheets"][sheet]["sections"][section]["template_columns"])
+
+    def get_values(self, sheet: str, section: str, unit: str) -> pd.DataFrame:
+        """Get the labels, years and values of a tidy section in the given unit.
+
+        Works with any layout, backend or unit system.
+        """
+        data = utils.to_long_dataframe(self.tidy_sheets[sheet][section])
+        value_col = data.columns[-1]
+        factor = get_factor(utils.get_units_in_brackets(value_col, "[]"), unit)
+        values = data[value_col].to_numpy(dtype="float64") * factor
+        columns = [*self.get_template_columns(sheet, section), "year"]
+        return data[columns].assign(value=values, year=data["year"].astype("int64"))
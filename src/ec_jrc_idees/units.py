@@ -0,0 +1,57 @@
+"""Numeric unit conversion of tidy data.
+
+Units and target unit systems are defined in `config/units.yaml`.
+Conversion factors are memoized, so each section only pays for one multiplication.
+"""
+
+import importlib.resources
+from functools import cache
+from typing import NamedTuple
+
+import yaml
+
+
+class Conversion(NamedTuple):
+    """Factor to multiply values with, and the resulting unit."""
+
+    factor: float
+    unit: str
+
+
+@cache
+def get_unit_config() -> dict:
+    """Get the internal unit configuration."""
+    path = importlib.resources.files("ec_jrc_idees") / "config/units.yaml"
+    return yaml.safe_load(path.read_text())
+
+
+def get_unit_systems() -> list[str]:
+    """Get the names of the available unit systems."""
+    return list(get_unit_config()["systems"])
+
+
+@cache
+def get_factor(source: str, target: str) -> float:
+    """Get the factor converting values from one unit to another."""
+    units = get_unit_config()["units"]
+    for unit in (source, target):
+        if unit not in units:
+            raise ValueError(f"Unknown unit: '{unit}'.")
+    if units[source]["dimension"] != units[target]["dimension"]:
+        raise ValueError(f"Incompatible units: '{source}' and '{target}'.")
+    return float(units[source]["factor"]) / float(units[target]["factor"])
+
+
+@cache
+def get_conversion(unit: str, system: str) -> Conversion:
+    """Get the conversion of a unit into a unit system (e.g., 'si').
+
+    Units whose dimension is not part of the system are kept as they are.
+    """
+    cnf = get_unit_config()
+    if system not in cnf["systems"]:
+        raise ValueError(f"Unknown unit system: '{system}'.")
+    if unit not in cnf["units"]:
+        raise ValueError(f"Unknown unit: '{unit}'.")
+    target = cnf["systems"][system].get(cnf["units"][unit]["dimension"], unit)
+    return Conversion(get_factor(unit, target), target)
@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Literal, NamedTuple
 
 import inflection
+import numpy as np
 import pandas as pd
 import pycountry
 from styleframe import StyleFrame
@@ -12,6 +13,11 @@ STYLE_FEATURES = Literal[
     "bg_color", "bold", "font_color", "underline", "border_type", "indent"
 ]
 BRACKETS = Literal["()", "[]", "<>"]
+OUTPUT_FORMATS = Literal["csv", "parquet"]
+LAYOUTS = Literal["long", "wide"]
+BACKENDS = Literal["pandas", "polars"]
+VALUE_DTYPES = Literal["float64", "float32"]
+YEAR_DTYPES = Literal["int64", "int16"]
 
 MIN_YEAR = 2000
 MAX_YEAR_V1 = 2015
@@ -27,6 +33,23 @@ class Metadata(NamedTuple):
     country_eurostat: str
 
 
+class ParserOptions(NamedTuple):
+    """Settings that change how files are parsed and what results look like."""
+
+    layout: LAYOUTS = "long"
+    backend: BACKENDS = "pandas"
+    # Target unit system of values (see `units.py`). Original units if None.
+    unit_system: str | None = None
+    # Smaller types halve memory use. Checks and conversions still use float64.
+    value_dtype: VALUE_DTYPES = "float64"
+    year_dtype: YEAR_DTYPES = "int64"
+
+    def check(self) -> None:
+        """Reject combinations of options that cannot be processed."""
+        if self.backend == "polars" and self.layout != "long":
+            raise ValueError("The polars backend only supports the long layout.")
+
+
 def get_filename_metadata(filepath: str | Path) -> Metadata:
     """Get metadata from the JRC-IDEES filenames."""
     filename = Path(filepath).name
@@ -63,6 +86,36 @@ def insert_prefix_columns(data: pd.DataFrame, prefixes: dict):
         data.insert(0, column, value, allow_duplicates=False)
 
 
+def harmonize_labels(data: pd.DataFrame, remap: dict, validation: dict) -> pd.DataFrame:
+    """Rename labels and check them against the configured vocabularies.
+
+    Labeled columns become categoricals whose categories are the vocabulary, so
+    data of different versions and countries can be concatenated cheaply.
+    Columns in `validation["expected"]` must be present, those in
+    `validation["optional"]` are only checked if present.
+    """
+    expected = validation.get("expected", {})
+    vocabularies = expected | validation.get("optional", {})
+    missing = set(expected) - set(data.columns)
+    if missing:
+        raise ValueError(f"Missing expected columns: {missing}.")
+    data = data.copy(deep=False)
+    for column, vocabulary in vocabularies.items():
+        if column not in data.columns:
+            continue
+        labels = data[column].astype("category")
+        dtype = pd.CategoricalDtype(vocabulary)
+        renamed = labels.cat.categories.map(lambda x: remap.get(column, {}).get(x, x))
+        new_codes = dtype.categories.get_indexer(renamed)
+        invalid = labels.cat.categories[new_codes == -1]
+        if not invalid.empty:
+            raise ValueError(f"Unexpected labels in '{column}': {list(invalid)}.")
+        # Position -1 keeps missing values missing.
+        new_codes = np.append(new_codes, -1)[labels.cat.codes.to_numpy()]
+        data[column] = pd.Categorical.from_codes(new_codes, dtype=dtype)
+    return data
+
+
 def get_style_feature(
     style: StyleFrame, feature: STYLE_FEATURES, rows: pd.Index | None = None
 ) -> pd.Series:
@@ -87,6 +140,12 @@ def get_expected_years(metadata: Metadata) -> list[int]:
     return list(range(MIN_YEAR, max_year + 1))
 
 
+def get_year_column_mask(columns: pd.Index) -> np.ndarray:
+    """Identify columns labelled with a valid IDEES year."""
+    labels = pd.to_numeric(pd.Series(columns, dtype="object"), errors="coerce")
+    return labels.between(MIN_YEAR, MAX_YEAR_V2).to_numpy()
+
+
 def convert_eu_code_to_alpha3(eu_code: str):
     """Convert EU country code to ISO 3166 alpha 3.
 
@@ -102,3 +161,137 @@ def convert_eu_code_to_alpha3(eu_code: str):
             eu_code = "GB"
     lookup = pycountry.countries.lookup(eu_code)
     return lookup.alpha_3
+
+
+def get_selection(
+    cnf: dict, sheets: list[str] | None = None, sections: list[str] | None = None
+) -> dict[str, list[str] | None]:
+    """Translate lists of sheet and section names into a selection for `select_config`.
+
+    Sections are searched within all requested sheets, and sheets left without
+    sections are not selected. Raises an error if requested names are not
+    configured, or if nothing is selected.
+    """
+    unknown_sheets = set(sheets or []) - set(cnf["sheets"])
+    if unknown_sheets:
+        raise ValueError(f"Requested sheets not configured: {sorted(unknown_sheets)}.")
+    configured = {
+        name for sheet_cnf in cnf["sheets"].values() for name in sheet_cnf["sections"]
+    }
+    unknown_sections = set(sections or []) - configured
+    if unknown_sections:
+        raise ValueError(
+            f"Requested sections not configured: {sorted(unknown_sections)}."
+        )
+    selection: dict[str, list[str] | None] = {}
+    for sheet, sheet_cnf in cnf["sheets"].items():
+        if sheets is not None and sheet not in sheets:
+            continue
+        if sections is None:
+            selection[sheet] = None
+            continue
+        names = [name for name in sheet_cnf["sections"] if name in sections]
+        if names:
+            selection[sheet] = names
+    if not selection:
+        raise ValueError("No configured sections match the requested sheets.")
+    return selection
+
+
+def match_rules(text: pd.Series, rules: list[dict], key: str) -> np.ndarray:
+    """Label text using the first matching rule in a table of regex patterns.
+
+    Each rule is a dictionary with a `pattern` and the resulting label in `key`.
+    Raises an error if some text matches no rule.
+    """
+    matches = [text.str.contains(rule["pattern"]).to_numpy(bool) for rule in rules]
+    unmatched = ~np.logical_or.reduce(matches, initial=False)
+    if unmatched.any():
+        raise ValueError(f"Could not identify {key} for: {list(text[unmatched])}.")
+    labels = np.select(matches, [rule[key] for rule in rules], default="")
+    return labels.astype(object)
+
+
+def select_config(cnf: dict, select: dict[str, list[str] | None]) -> dict:
+    """Get a copy of a file configuration limited to selected sheets and sections.
+
+    `select` maps sheet names to a list of section names, or `None` for all
+    (see `get_selection` to build it from lists of names).
+    Raises an error if selected names are not configured.
+    """
+    filtered = {}
+    for sheet, sections in select.items():
+        if sheet not in cnf["sheets"]:
+            raise ValueError(f"Selected sheet is not configured: '{sheet}'.")
+        sheet_cnf = cnf["sheets"][sheet]
+        if sections is not None:
+            missing = set(sections) - set(sheet_cnf["sections"])
+            if missing:
+                raise ValueError(f"Selected sections not configured: {missing}.")
+            sheet_cnf = sheet_cnf | {
+                "sections": {name: sheet_cnf["sections"][name] for name in sections}
+            }
+        filtered[sheet] = sheet_cnf
+    return cnf | {"sheets": filtered}
+
+
+def to_long_dataframe(tidy_df) -> pd.DataFrame:
+    """Get tidy data of any layout or backend as a long pandas dataframe."""
+    if not isinstance(tidy_df, pd.DataFrame):
+        tidy_df = tidy_df.to_pandas()
+    if "year" in tidy_df.columns:
+        return tidy_df
+    years = [col for col in tidy_df.columns if isinstance(col, int)]
+    id_columns = [col for col in tidy_df.columns if col not in years]
+    return tidy_df.melt(
+        id_vars=id_columns,
+        value_vars=years,
+        var_name="year",
+        value_name=tidy_df.columns.name,
+    ).astype({"year": "int64"})
+
+
+def split_value_name(value_name: str) -> tuple[str, str]:
+    """Split a 'variable [unit]' label into its variable and unit."""
+    unit = get_units_in_brackets(value_name, brackets="[]")
+    return value_name[: value_name.find("[")].strip(), unit
+
+
+def label_wide_dataframe(data: pd.DataFrame) -> pd.DataFrame:
+    """Add the variable and unit of wide data as columns, before the years.
+
+    In memory, wide data keeps them as the name of the column index, which file
+    formats do not preserve.
+    """
+    variable, unit = split_value_name(data.columns.name)
+    position = int(np.argmax(get_year_column_mask(data.columns)))
+    labelled = data.copy(deep=False)
+    labelled.insert(position, "variable", variable)
+    labelled.insert(position + 1, "unit", unit)
+    return labelled
+
+
+def write_dataframe(data: pd.DataFrame, path: str | Path, fmt: OUTPUT_FORMATS):
+    """Save a dataframe to disk in the requested format, creating folders if needed.
+
+    Wide data is saved with its variable and unit as columns.
+    """
+    if not isinstance(data, pd.DataFrame):
+        from ec_jrc_idees import polars_backend
+
+        polars_backend.sink(data.lazy(), path, fmt)
+        return
+    if data.columns.name is not None:
+        data = label_wide_dataframe(data)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    match fmt:
+        case "csv":
+            data.to_csv(path, index=False)
+        case "parquet":
+            # Parquet requires text column names (e.g., years in the wide layout).
+            data.set_axis(data.columns.astype(str), axis="columns").to_parquet(
+                path, index=False
+            )
+        case _:
+            raise ValueError(f"Invalid output format: '{fmt}'.")
@@ -0,0 +1,136 @@
+"""Test appendix lookups."""
+
+import importlib.resources
+import zipfile
+
+import pandas as pd
+import pytest
+
+from ec_jrc_idees import appendix
+from ec_jrc_idees.transport import TransportFile
+
+ODS_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content
+    xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+    xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+    xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">
+<office:body><office:spreadsheet><table:table table:name="Sheet1">
+<table:table-row>
+<table:table-cell><text:p>A</text:p></table:table-cell>
+<table:table-cell table:number-columns-repeated="2"/>
+<table:table-cell table:number-columns-repeated="2">
+<text:p>x</text:p>
+</table:table-cell>
+<table:table-cell table:number-columns-repeated="1000"/>
+</table:table-row>
+<table:table-row>
+<table:table-cell table:number-columns-repeated="1000"/>
+</table:table-row>
+</table:table></office:spreadsheet></office:body>
+</office:document-content>
+"""
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Compile lookups into a temporary cache."""
+    monkeypatch.setenv(appendix.CACHE_ENV_VAR, str(tmp_path))
+    appendix.get_table.cache_clear()
+    appendix.get_fuel_codes.cache_clear()
+    appendix.get_process_categories.cache_clear()
+    return tmp_path / "appendix"
+
+
+def test_read_ods():
+    """Spreadsheet text should be read without surrounding whitespace."""
+    source = importlib.resources.files("ec_jrc_idees")
+    path = source / "config/appendix/fuel_code_idees_to_eurostat.ods"
+    header, *rows = appendix.read_ods_table(path)
+    assert header == ["Sector", "IDEES_fuel_label", "IDEES_fuel_code", "Eurostat_codes"]
+    assert rows[0][:2] == ["Industry", "Solids"]
+
+
+def test_read_ods_repeated_cells(tmp_path):
+    """Repeated cells should keep their columns, without trailing empty cells."""
+    path = tmp_path / "table.ods"
+    with zipfile.ZipFile(path, "w") as ods:
+        ods.writestr("content.xml", ODS_CONTENT)
+    assert appendix.read_ods_table(path) == [["A", "", "", "x", "x"]]
+
+
+def test_compile_once(cache_dir):
+    """Tables should only be compiled on first use."""
+    first = appendix.compile_table("categories_non_energy_intensive")
+    mtime = first.stat().st_mtime_ns
+    second = appendix.compile_table("categories_non_energy_intensive")
+    assert first == second
+    assert second.stat().st_mtime_ns == mtime
+    assert first.parent == cache_dir
+
+
+@pytest.mark.parametrize(
+    ("sector", "fuel", "expected"),
+    [
+        ("Road transport", "Diesel", "O4671XR5220B"),
+        ("Road transport", "Diesel oil", "O4671XR5220B"),
+        ("Road transport", "BioDiesel", "R5220B"),
+        ("Industry", "Coke", "C0312"),
+        ("Residential and services", "Solar", "RA410"),
+    ],
+)
+def test_fuel_codes(sector, fuel, expected):
+    """Fuels should be found by label or code, with separate Eurostat codes."""
+    assert expected in appendix.get_fuel_codes(sector)[fuel]
+
+
+def test_process_categories():
+    """Processes should be grouped per (sub)sector."""
+    processes = appendix.get_process_categories(energy_intensive=True)
+    assert "Electric arc" in processes["Iron and steel (ISI)/Electric arc"]
+    processes = appendix.get_process_categories(energy_intensive=False)
+    assert "Drying" in processes["Food, beverages and tobacco (FBT)"]
+
+
+def test_map_to_eurostat():
+    """Carrier columns should be mapped to Eurostat codes."""
+    carriers = pd.Series(
+        ["Gasoline", "Electricity", None, "Gasoline"], index=[3, 4, 5, 6]
+    )
+    result = appendix.map_to_eurostat(carriers, "Road transport")
+    assert list(result.index) == [3, 4, 5, 6]
+    assert result[4] == ("E7000",)
+    assert result[5] is None
+    assert result[3] == result[6]
+    with pytest.raises(ValueError, match="Hydrogen"):
+        appendix.map_to_eurostat(pd.Series(["Hydrogen"]), "Road transport")
+
+
+def test_map_unused_categories():
+    """Only fuels present in a column should be looked up."""
+    carriers = pd.Categorical(["Diesel"], categories=["Diesel", "Hydrogen"])
+    result = appendix.map_to_eurostat(pd.Series(carriers), "Road transport")
+    assert "O4671XR5220B" in result[0]
+
+
+@pytest.mark.parametrize("sector", ["Road transport"])
+def test_biofuel_codes(sector):
+    """Biofuel codes should be split from their fossil fuels, not shared."""
+    fuel_codes = appendix.get_fuel_codes(sector)
+    for biofuel, rule in appendix.get_biofuels()[sector].items():
+        assert fuel_codes[biofuel] == tuple(rule["codes"])
+        assert not set(fuel_codes[biofuel]) & set(fuel_codes[rule["fossil"]])
+    assert fuel_codes["BioLPG"] == ()
+
+
+def test_map_tidy_carriers(easy_idees, country_path, country):
+    """Carriers of harmonized tidy data, including biofuels, should be mapped."""
+    file = TransportFile(
+        easy_idees.get_filepath(country_path, "Transport", country),
+        easy_idees.get_sector_config("Transport"),
+        select={"TrRoad_ene": None},
+    )
+    file.tidy_up()
+    carriers = file.tidy_sheets["TrRoad_ene"]["RoadEnergyConsumption"]["carrier"]
+    assert appendix.map_to_eurostat(carriers, "Road transport").notna().all()
+    fossil = carriers[~carriers.astype(str).str.startswith("Bio")]
+    assert appendix.map_to_eurostat(fossil, "Road transport").notna().all()
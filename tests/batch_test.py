@@ -0,0 +1,211 @@
+"""Test fault-isolated batch processing."""
+
+import io
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import requests
+
+from ec_jrc_idees import parser
+from ec_jrc_idees.batch import (
+    Journal,
+    Options,
+    RetryPolicy,
+    WorkUnit,
+    fetch_country,
+    get_fingerprint,
+    get_output_path,
+    run_batch,
+    run_unit,
+    write_unit,
+)
+from ec_jrc_idees.parser import EasyIDEES
+from ec_jrc_idees.utils import Metadata
+
+UNITS = [WorkUnit(2021, country, "Transport") for country in ["DE", "FR", "IT"]]
+
+
+def broken_worker(unit: WorkUnit) -> str:
+    """Fail for one country only."""
+    if unit.country == "FR":
+        raise ValueError("Checksum mismatch.")
+    return unit.country
+
+
+class FlakyWorker:
+    """Raise I/O errors a given number of times before succeeding."""
+
+    def __init__(self, failures: int, error: type[Exception] = OSError) -> None:
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, unit: WorkUnit) -> str:
+        """Run the unit, maybe failing."""
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("Connection reset.")
+        return unit.country
+
+
+@pytest.fixture
+def journal(tmp_path) -> Journal:
+    """Empty journal."""
+    return Journal(tmp_path / "journal.jsonl")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_failures_are_isolated(journal, jobs):
+    """A failing unit should be recorded without stopping the others."""
+    outcomes = {o.unit: o for o in run_batch(UNITS, broken_worker, journal, jobs=jobs)}
+    assert [outcomes[unit].status for unit in UNITS] == ["done", "failed", "done"]
+    assert "Checksum mismatch" in outcomes[UNITS[1]].error
+    assert outcomes[UNITS[0]].result == "DE"
+
+
+def test_resume_only_failed(journal):
+    """Reruns should skip units finished in previous runs."""
+    list(run_batch(UNITS, broken_worker, journal))
+    rerun = list(run_batch(UNITS, lambda unit: unit.country, journal))
+    assert [outcome.unit for outcome in rerun] == [UNITS[1]]
+    assert journal.get_pending(UNITS) == []
+
+
+def test_resume_needs_same_settings(journal):
+    """Units finished with other settings should be processed again."""
+    list(run_batch(UNITS, lambda unit: unit.country, journal))
+    other = Journal(journal.path, get_fingerprint({"layout": "wide"}))
+    assert other.get_pending(UNITS) == UNITS
+    list(run_batch(UNITS[:1], lambda unit: unit.country, other))
+    assert other.get_pending(UNITS) == UNITS[1:]
+    assert journal.get_pending(UNITS) == UNITS[:1]
+
+
+def test_journal_ignores_partial_lines(journal):
+    """An interrupted write should not break resuming."""
+    list(run_batch(UNITS[:1], broken_worker, journal))
+    with journal.path.open("a") as file:
+        file.write('{"version": 2021, "coun')
+    assert journal.load() == {UNITS[0]: "done"}
+
+
+@pytest.mark.parametrize(
+    ("failures", "error", "status", "attempts"),
+    [(2, OSError, "done", 3), (3, OSError, "failed", 3), (1, ValueError, "failed", 1)],
+)
+def test_retry_policy(failures, error, status, attempts):
+    """Only retryable errors should be attempted again, up to the limit."""
+    outcome = run_unit(
+        FlakyWorker(failures, error), UNITS[0], RetryPolicy(max_attempts=3)
+    )
+    assert outcome.status == status
+    assert outcome.attempts == attempts
+
+
+def test_retry_delay():
+    """Waiting times should grow with each attempt."""
+    policy = RetryPolicy(delay=1.0, backoff=2.0)
+    assert [policy.get_delay(i) for i in [1, 2, 3]] == [1.0, 2.0, 4.0]
+
+
+def test_output_path():
+    """Outputs should be partitioned by version, sector, sheet and section."""
+    metadata = Metadata(2021, "Transport", "DE")
+    path = get_output_path(
+        Path("out"), metadata, "TrRoad_ene", "RoadEnergyConsumption", "csv"
+    )
+    assert path == Path("out/2021/Transport/TrRoad_ene/RoadEnergyConsumption/DE.csv")
+
+
+class FakeResponse:
+    """Stand-in for a streamed download."""
+
+    def __init__(self, content: bytes, status: int = 200) -> None:
+        self.content = content
+        self.status = status
+
+    def raise_for_status(self) -> None:
+        """Fail for unsuccessful requests."""
+        if self.status != 200:  # noqa: PLR2004
+            raise requests.HTTPError(f"{self.status} Error.")
+
+    def iter_content(self, chunk_size: int):
+        """Yield the content in chunks."""
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+
+@pytest.fixture
+def downloads(monkeypatch) -> list[FakeResponse]:
+    """Responses served, in order, instead of downloading."""
+    responses: list[FakeResponse] = []
+    monkeypatch.setattr(parser.requests, "get", lambda url, stream: responses.pop(0))
+    return responses
+
+
+def make_zip() -> bytes:
+    """Create a small country zip."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("JRC-IDEES-2021_Transport_DE.xlsx", "data")
+    return buffer.getvalue()
+
+
+def test_download_error(downloads, tmp_path):
+    """Failed requests should leave no files behind."""
+    downloads.append(FakeResponse(b"Not found", status=404))
+    with pytest.raises(requests.HTTPError):
+        EasyIDEES(2021).download_country("DE", tmp_path / "idees_DE.zip")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_fetch_broken_zip(downloads, tmp_path):
+    """Truncated downloads should be retried instead of cached."""
+    content = make_zip()
+    downloads += [FakeResponse(content[: len(content) // 2]), FakeResponse(content)]
+    easy = EasyIDEES(2021)
+    outcome = run_unit(
+        lambda unit: fetch_country(easy, unit.country, tmp_path, cache=True),
+        UNITS[0],
+        RetryPolicy(max_attempts=2),
+    )
+    assert outcome.status == "done"
+    assert outcome.attempts == 2  # noqa: PLR2004
+    assert [path.name for path in outcome.result.iterdir()] == [
+        "JRC-IDEES-2021_Transport_DE.xlsx"
+    ]
+    assert sorted(path.name for path in (tmp_path / "v2021").iterdir()) == [
+        "DE",
+        "idees_DE.zip",
+    ]
+
+
+def test_write_unit(tmp_path, capsys):
+    """Failed checks should be returned to the caller instead of printed."""
+    options = Options(
+        ["Transport"],
+        None,
+        None,
+        "long",
+        "pandas",
+        tmp_path,
+        "csv",
+        tmp_path,
+        True,
+        None,
+    )
+    tidy_df = pd.DataFrame({"year": [2021], "TotalStock [vehicles]": [1.0]})
+    report = pd.DataFrame(
+        {"check": ["vkm_stock_keys", "energy_totals"], "status": ["passed", "failed"]}
+    )
+    written = write_unit(
+        UNITS[0], {"TrRoad_tech": {"RoadTotalStock": tidy_df}}, report, options
+    )
+    assert written.paths == [
+        tmp_path / "2021/Transport/TrRoad_tech/RoadTotalStock/DE.csv"
+    ]
+    assert written.failed_checks == ["energy_totals"]
+    assert (tmp_path / "checks/2021_Transport_DE.csv").exists()
+    assert capsys.readouterr().err == ""
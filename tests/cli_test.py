@@ -0,0 +1,95 @@
+"""Test the command-line interface."""
+
+import pytest
+
+from ec_jrc_idees import cli
+
+
+def test_process_defaults():
+    """Default processing should cover all sectors and sections of one version."""
+    args = cli.get_argument_parser().parse_args(["process"])
+    assert args.versions == [2021]
+    assert args.countries is None
+    assert args.sheets is None
+    assert args.sections is None
+    assert args.jobs == 1
+    assert args.fmt == "csv"
+    assert args.cache
+
+
+def test_invalid_parser_options(tmp_path):
+    """Unsupported backend and layout combinations should fail before processing."""
+    args = cli.get_argument_parser().parse_args(
+        ["process", "--backend", "polars", "--layout", "wide", "-o", str(tmp_path)]
+    )
+    with pytest.raises(ValueError, match="only supports the long layout"):
+        cli.run_process(args)
+
+
+def test_invalid_section(tmp_path):
+    """Misspelled sections should be rejected before processing."""
+    args = cli.get_argument_parser().parse_args(
+        ["process", "--sections", "RoadVKN", "-o", str(tmp_path)]
+    )
+    with pytest.raises(ValueError, match="RoadVKN"):
+        cli.run_process(args)
+    assert not (tmp_path / "journal.jsonl").exists()
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["process", "--versions", "2015", "2021", "--countries", "DE", "FR"],
+        ["process", "--sheets", "TrRoad_ene", "--sections", "RoadEnergyConsumption"],
+        ["process", "-j", "4", "--format", "csv", "--no-cache", "--profile"],
+        ["process", "--retries", "2", "--retry-delay", "0.5", "--restart"],
+        ["process", "--unit-system", "si"],
+        ["process", "--value-dtype", "float32", "--year-dtype", "int16"],
+        ["process", "--scheduler", "tcp://127.0.0.1:8786", "--retries", "1"],
+    ],
+)
+def test_process_options(argv):
+    """Selection, parallelism and output options should be parsed."""
+    args = cli.get_argument_parser().parse_args(argv)
+    assert args.command == "process"
+
+
+def test_invalid_country(tmp_path):
+    """Countries not available in a version should be rejected before processing."""
+    args = cli.get_argument_parser().parse_args(
+        ["process", "--versions", "2021", "--countries", "UK", "-o", str(tmp_path)]
+    )
+    with pytest.raises(ValueError, match="Invalid countries"):
+        cli.run_process(args)
+
+
+def test_failed_units_are_reported(tmp_path, monkeypatch):
+    """Failing units should be journaled and returned instead of stopping the run."""
+
+    def fail_fetch(*args):
+        raise ValueError("Broken file.")
+
+    monkeypatch.setattr(cli, "fetch_country", fail_fetch)
+    argv = ["process", "--countries", "DE", "FR", "-o", str(tmp_path)]
+    failed = cli.run_process(cli.get_argument_parser().parse_args(argv))
+    assert [outcome.unit.country for outcome in failed] == ["DE", "FR"]
+    assert (tmp_path / "journal.jsonl").exists()
+
+
+def test_fingerprint_ignores_locations(tmp_path):
+    """Only settings that change outputs should change the journal fingerprint."""
+    args = cli.get_argument_parser().parse_args(["process", "-o", str(tmp_path)])
+    options = cli.get_options(args)
+    moved = options._replace(cache_dir=tmp_path / "elsewhere", cache=False)
+    assert moved.get_fingerprint() == options.get_fingerprint()
+    wide = options._replace(layout="wide")
+    assert wide.get_fingerprint() != options.get_fingerprint()
+
+
+def test_serve_options():
+    """The service should listen on localhost ports or Unix sockets."""
+    args = cli.get_argument_parser().parse_args(
+        ["serve", "--address", "unix:/tmp/idees.sock", "--max-files", "4"]
+    )
+    assert args.command == "serve"
+    assert args.address == "unix:/tmp/idees.sock"
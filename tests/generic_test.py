@@ -7,7 +7,7 @@ import pandas as pd
 import pytest
 import yaml
 
-from ec_jrc_idees.generics import IDEESFile, IDEESSection, IDEESSheet
+from ec_jrc_idees.generics import IDEESFile, IDEESSection, IDEESSheet, LazyMapping
 
 DUMMY_TIDY_DF = pd.DataFrame(True, columns=[1, 2, 3], index=[1, 2, 3])
 
@@ -41,12 +41,12 @@ class Sheet(IDEESSheet):
     SECTION_CLEANERS = [Section]
 
     @override
-    def check(self):
+    def check_section(self, name, tidy_df):
         pass
 
     @override
-    def prettify(self):
-        pass
+    def prettify_section(self, name, tidy_df):
+        return tidy_df
 
 
 class File(IDEESFile):
@@ -113,3 +113,42 @@ def test_generic_file_preparation(dummy_cleaner: File, dummy_cnf):
     assert DUMMY_TIDY_DF.equals(
         dummy_cleaner.tidy_sheets[Sheet.__name__][Section.__name__]
     )
+
+
+class SmallSection(Section):
+    """Dummy section covering the first rows of a sheet."""
+
+    EXCEL_ROW_RANGE = (2, 5)
+
+
+def test_non_numeric_cells(tmp_path):
+    """Text in yearly data should be read as missing, and rejected when checked."""
+    path = tmp_path / "JRC-IDEES-2021_Transport_DE.xlsx"
+    data = pd.DataFrame(
+        {"Germany": ["a", "b", "c"], 2000: [1.0, "n.a.", None], 2001: [1.0, 2.0, 3.0]}
+    )
+    data.to_excel(path, sheet_name=Sheet.SHEET_NAME, index=False)
+    sheet = Sheet(pd.ExcelFile(path), {"sections": {}})
+    section = SmallSection(sheet, {})
+    assert pd.isna(section.get_annual_dataframe().loc[1, 2000])
+    section.check_numeric(pd.Index([0, 2]))
+    with pytest.raises(ValueError, match=r"Non-numeric values in rows: \[1\]"):
+        section.check_numeric(pd.Index([0, 1]))
+
+
+def test_lazy_mapping():
+    """Values should only be computed once, on first access."""
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return key.upper()
+
+    lazy = LazyMapping(["a", "b"], loader)
+    assert list(lazy) == ["a", "b"]
+    assert not calls
+    assert lazy["a"] == "A"
+    assert lazy["a"] == "A"
+    assert calls == ["a"]
+    with pytest.raises(KeyError):
+        lazy["c"]
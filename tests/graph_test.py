@@ -0,0 +1,137 @@
+"""Test batch processing as a task graph."""
+
+import operator
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ec_jrc_idees import graph
+from ec_jrc_idees.batch import Options, Outcome, WorkUnit, Written, get_output_path
+from ec_jrc_idees.utils import Metadata
+
+UNITS = [WorkUnit(2021, country, "Transport") for country in ["DE", "FR"]]
+
+
+@pytest.fixture
+def options(tmp_path) -> Options:
+    """Options limited to one section."""
+    return Options(
+        sectors=["Transport"],
+        sheets=["TrRoad_act"],
+        sections=["RoadVKM"],
+        layout="long",
+        backend="pandas",
+        output_dir=tmp_path,
+        fmt="csv",
+        cache_dir=tmp_path / "cache",
+        cache=True,
+        store=None,
+    )
+
+
+@pytest.fixture
+def _fake_steps(monkeypatch):
+    """Replace downloading and cleaning with quick stand-ins."""
+
+    def fetch(unit, options):
+        if unit.country == "FR":
+            raise ValueError("Broken download.")
+        return Path(unit.country)
+
+    def process(unit, country_dir, options):
+        return Written([country_dir], [])
+
+    monkeypatch.setattr(graph, "fetch", fetch)
+    monkeypatch.setattr(graph, "process", process)
+
+
+def test_build_graph(options):
+    """Countries should be fetched once and sections combined per version."""
+    units = [*UNITS, WorkUnit(2015, "DE", "Transport")]
+    task_graph, keys, combined = graph.build_graph(units, options)
+    assert keys == [
+        ("process", 2021, "DE", "Transport"),
+        ("process", 2021, "FR", "Transport"),
+        ("process", 2015, "DE", "Transport"),
+    ]
+    assert [key for key in task_graph if key[0] == "fetch"] == [
+        ("fetch", 2021, "DE"),
+        ("fetch", 2021, "FR"),
+        ("fetch", 2015, "DE"),
+    ]
+    assert task_graph[keys[2]][2] == ("fetch", 2015, "DE")
+    assert combined == [
+        ("combine", 2021, "Transport", "TrRoad_act", "RoadVKM"),
+        ("combine", 2015, "Transport", "TrRoad_act", "RoadVKM"),
+    ]
+    assert task_graph[combined[0]][2] == keys[:2]
+
+
+def test_combine_task(options):
+    """Countries saved in this or earlier runs should be combined, once any is done."""
+    section_dir = options.output_dir / "2021/Transport/TrRoad_act/RoadVKM"
+    section_dir.mkdir(parents=True)
+    for country in ["DEU", "FRA"]:
+        pd.DataFrame({"country": [country], "value": [1.0]}).to_csv(
+            section_dir / f"{country}.csv", index=False
+        )
+    pattern = section_dir / "*.csv"
+    failed = [Outcome(UNITS[1], "failed", 1, "Broken download.")]
+    assert graph.combine_task(pattern, failed, options) is None
+    done = [Outcome(UNITS[0], "done", 1), *failed]
+    path = graph.combine_task(pattern, done, options)
+    assert path == section_dir.with_name("RoadVKM.csv")
+    assert pd.read_csv(path)["country"].to_list() == ["DEU", "FRA"]
+
+
+def test_get_sync():
+    """Keys should be computed once, in dependency order."""
+    task_graph = {"a": 1, ("b", 1): (operator.add, "a", 2), "c": (sum, ["a", ("b", 1)])}
+    assert graph.get_sync(task_graph, ["c", ("b", 1)]) == [4, 3]
+
+
+@pytest.mark.usefixtures("_fake_steps")
+def test_run_graph_sync(options):
+    """Failing units should be reported without stopping the others."""
+    done, failed = graph.run_graph(UNITS, options)
+    assert done.status == "done"
+    assert done.result.paths == [Path("DE")]
+    assert failed.status == "failed"
+    assert failed.unit == UNITS[1]
+    assert "Broken download" in failed.error
+
+
+def test_run_graph_local_cluster(tmp_path, country_path, country, version):
+    """Real tasks should run in the worker processes of a Dask cluster."""
+    distributed = pytest.importorskip("distributed")
+    options = Options(
+        sectors=["Transport"],
+        sheets=None,
+        sections=["RoadVKM"],
+        layout="long",
+        backend="pandas",
+        output_dir=tmp_path,
+        fmt="csv",
+        cache_dir=country_path.parent.parent.resolve(),
+        cache=True,
+        store=None,
+    )
+    unit = WorkUnit(version, country, "Transport")
+    with (
+        distributed.LocalCluster(n_workers=1, processes=True) as cluster,
+        distributed.Client(cluster) as client,
+    ):
+        (outcome,) = graph.run_graph([unit], options, scheduler=client.get)
+    assert outcome.status == "done", outcome.error
+    path = get_output_path(
+        tmp_path,
+        Metadata(version, "Transport", country),
+        "TrRoad_act",
+        "RoadVKM",
+        "csv",
+    )
+    assert outcome.result.paths == [path]
+    assert (pd.read_csv(path)["country"] == "DEU").all()
+    combined = pd.read_csv(path.parent.with_name("RoadVKM.csv"))
+    assert combined.equals(pd.read_csv(path))
@@ -0,0 +1,113 @@
+"""Test the optional polars backend against the pandas implementation."""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import yaml
+
+from ec_jrc_idees import utils
+from ec_jrc_idees.transport import TransportFile
+
+pl = pytest.importorskip("polars")
+polars_backend = pytest.importorskip("ec_jrc_idees.polars_backend")
+
+TEMPLATE = ["category", "vehicle_type"]
+VALUE_NAME = "Stock [vehicles]"
+
+
+@pytest.fixture
+def tidy_df() -> pd.DataFrame:
+    """Section data before prettifying, as produced by the cleaners."""
+    return pd.DataFrame(
+        {
+            "category": ["Passenger", "Freight"],
+            "vehicle_type": ["Passenger cars", "Heavy goods vehicles"],
+            2000: [1.0, None],
+            2001: [2.5, 3.0],
+        },
+        index=[20, 25],
+    )
+
+
+def test_prettify_parity(tidy_df):
+    """Melting in polars should match pandas."""
+    expected = pd.melt(
+        tidy_df,
+        id_vars=TEMPLATE,
+        value_vars=[2000, 2001],
+        var_name="year",
+        value_name=VALUE_NAME,
+    ).infer_objects()
+    result = polars_backend.prettify_section(tidy_df, TEMPLATE, VALUE_NAME)
+    pd.testing.assert_frame_equal(result.to_pandas(), expected)
+
+
+def test_prefix_parity(tidy_df):
+    """Prefix columns should match pandas in order and type."""
+    prefixes = {"version": 2021, "country": "DEU"}
+    expected = tidy_df[TEMPLATE].reset_index(drop=True)
+    utils.insert_prefix_columns(expected, prefixes)
+    data = pl.from_pandas(tidy_df[TEMPLATE])
+    result = polars_backend.insert_prefix_columns(data, prefixes)
+    pd.testing.assert_frame_equal(result.to_pandas(), expected)
+
+
+def test_check_section(tidy_df):
+    """Validation should catch years outside the expected range."""
+    data = polars_backend.prettify_section(tidy_df, TEMPLATE, VALUE_NAME)
+    polars_backend.check_section(data, TEMPLATE, "Stock", [2000, 2001])
+    with pytest.raises(ValueError, match="year"):
+        polars_backend.check_section(data, TEMPLATE, "Stock", [2000])
+
+
+def test_compact_dtypes(tidy_df):
+    """Requested data types should be used and verified."""
+    options = utils.ParserOptions(value_dtype="float32", year_dtype="int16")
+    data = polars_backend.prettify_section(tidy_df, TEMPLATE, VALUE_NAME, options)
+    assert data.schema["year"] == pl.Int16
+    assert data.schema[VALUE_NAME] == pl.Float32
+    polars_backend.check_section(data, TEMPLATE, "Stock", [2000, 2001], options)
+    with pytest.raises(ValueError, match="must be int64"):
+        polars_backend.check_section(data, TEMPLATE, "Stock", [2000, 2001])
+
+
+def test_harmonize_parity(tidy_df):
+    """Label harmonization should match pandas."""
+    remap = {"category": {"Passenger": "Passenger transport"}}
+    validation = {
+        "expected": {"category": ["Passenger transport", "Freight"]},
+        "optional": {"carrier": ["Diesel"]},
+    }
+    expected = utils.harmonize_labels(tidy_df[TEMPLATE], remap, validation)
+    data = pl.from_pandas(tidy_df[TEMPLATE])
+    result = polars_backend.harmonize_labels(data, remap, validation).to_pandas()
+    assert list(result["category"]) == list(expected["category"])
+    assert list(result["category"].cat.categories) == ["Passenger transport", "Freight"]
+
+
+def test_concat_lazy(tidy_df):
+    """Lazy concatenation should stack frames with different years."""
+    data = polars_backend.prettify_section(tidy_df, TEMPLATE, VALUE_NAME)
+    wide = pl.from_pandas(tidy_df.rename(columns=str))
+    combined = polars_backend.concat_lazy([data, data.lazy(), wide]).collect()
+    assert combined.height == 2 * data.height + wide.height
+
+
+def test_transport_parity(country_path, country, version):
+    """The polars backend should reproduce pandas results for real files."""
+    cnf = yaml.safe_load(Path("src/ec_jrc_idees/config/Transport.yaml").read_text())
+    path = country_path / f"JRC-IDEES-{version}_Transport_{country}.xlsx"
+    pandas_file = TransportFile(path, cnf)
+    pandas_file.tidy_up()
+    polars_file = TransportFile(path, cnf, backend="polars")
+    polars_file.tidy_up()
+    for sheet, sections in pandas_file.tidy_sheets.items():
+        for section, expected in sections.items():
+            result = polars_file.tidy_sheets[sheet][section].to_pandas()
+            # Polars enums are always ordered
+            categorical = result.select_dtypes("category").columns
+            result[categorical] = result[categorical].apply(
+                lambda x: x.cat.as_unordered()
+            )
+            pd.testing.assert_frame_equal(result, expected)
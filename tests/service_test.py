@@ -0,0 +1,135 @@
+"""Test the warm worker service and its client."""
+
+import socket
+import threading
+
+import pandas as pd
+import pytest
+
+from ec_jrc_idees.store import TidyStore
+
+pytest.importorskip("pyarrow")
+service = pytest.importorskip("ec_jrc_idees.service")
+
+
+@pytest.fixture
+def tidy_df() -> pd.DataFrame:
+    """Harmonized long tidy data."""
+    return pd.DataFrame(
+        {
+            "country": ["DEU", "DEU"],
+            "carrier": pd.Categorical(["Diesel", "LPG"], categories=["Diesel", "LPG"]),
+            "year": pd.Series([2000, 2001], dtype="int16"),
+            "TotalEnergyConsumption [ktoe]": pd.Series([1.5, None], dtype="float32"),
+        }
+    )
+
+
+@pytest.fixture(params=["tcp", "unix"])
+def start_client(request, tmp_path):
+    """Start a service in a background thread, given its cache, and get a client."""
+    store = TidyStore(tmp_path / "idees.db")
+    store.add_section(
+        "TrRoad_tech",
+        "RoadTotalStock",
+        pd.DataFrame(
+            {
+                "version": 2021,
+                "sector": "Transport",
+                "country": "DEU",
+                "vehicle_type": ["Passenger cars", "Heavy goods vehicles"],
+                "year": 2021,
+                "TotalStock [vehicles]": [10.0, 2.0],
+            }
+        ),
+    )
+    store.close()
+    servers = []
+
+    def start(cache_dir):
+        worker = service.IDEESService(cache_dir, tmp_path / "idees.db")
+        if request.param == "unix":
+            address = f"unix:{tmp_path / 'service.sock'}"
+            server = service.create_server(address, worker)
+        else:
+            server = service.create_server("127.0.0.1:0", worker)
+            address = "{}:{}".format(*server.server_address)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return service.IDEESClient(address, timeout=60)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def client(start_client, tmp_path):
+    """Client of a service with an empty download cache."""
+    return start_client(tmp_path / "cache")
+
+
+def test_arrow_roundtrip(tidy_df):
+    """Data types and categories should survive serialization."""
+    result = service.from_arrow_bytes(service.to_arrow_bytes(tidy_df))
+    pd.testing.assert_frame_equal(result, tidy_df)
+
+
+def test_arrow_roundtrip_wide(tidy_df):
+    """Wide data should keep its numeric years and variable name."""
+    wide = pd.DataFrame({"carrier": ["Diesel"], 2000: [1.0], 2001: [2.0]})
+    wide.columns.name = "TotalEnergyConsumption [ktoe]"
+    result = service.from_arrow_bytes(service.to_arrow_bytes(wide))
+    pd.testing.assert_frame_equal(result, wide, check_column_type=False)
+    assert result.columns.name == wide.columns.name
+
+
+def test_status(client):
+    """A new service should have nothing warm yet."""
+    assert client.get_status() == {"versions": [], "sectors": [], "files": []}
+
+
+def test_query(client):
+    """Queries should read from the store of the service."""
+    result = client.query(vehicle_type="Passenger cars", country="DE")
+    assert list(result["value"]) == [10.0]  # noqa: PLR2004
+
+
+def test_invalid_job(client):
+    """Errors of the service should be raised by the client."""
+    with pytest.raises(ValueError, match="Invalid country"):
+        client.parse(2021, "XX", "TrRoad_act", "RoadVKM")
+
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "", "unknown.invalid"])
+def test_reject_public_host(tmp_path, host):
+    """Servers should only listen on this machine."""
+    worker = service.IDEESService(tmp_path / "cache")
+    with pytest.raises(ValueError, match="loopback"):
+        service.create_server(f"{host}:0", worker)
+
+
+def test_replace_stale_socket(tmp_path):
+    """Sockets left by previous servers should be replaced, but no other files."""
+    worker = service.IDEESService(tmp_path / "cache")
+    path = tmp_path / "service.sock"
+    with socket.socket(socket.AF_UNIX) as stale:
+        stale.bind(str(path))
+    with service.create_server(f"unix:{path}", worker):
+        pass
+    path.unlink()
+    path.write_text("data")
+    with pytest.raises(ValueError, match="not a socket"):
+        service.create_server(f"unix:{path}", worker)
+    assert path.read_text() == "data"
+
+
+def test_parse(start_client, country_path, country, version):
+    """Parsing jobs should return the same data as parsing in-process."""
+    # Re-use the files downloaded for testing (cache_dir/v<version>/<country>).
+    client = start_client(country_path.parent.parent.resolve())
+    data = client.parse(version, country, "TrRoad_act", "RoadVKM")
+    again = client.parse(version, country, "TrRoad_act", "RoadVKM")
+    pd.testing.assert_frame_equal(data, again)
+    assert len(client.get_status()["files"]) == 1
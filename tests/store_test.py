@@ -0,0 +1,99 @@
+"""Test the local query store."""
+
+import pandas as pd
+import pytest
+
+from ec_jrc_idees.store import TidyStore
+
+
+def make_section(version: int, country: str, value: float) -> pd.DataFrame:
+    """Create a small long-format tidy section."""
+    return pd.DataFrame(
+        {
+            "version": version,
+            "sector": "Transport",
+            "country": country,
+            "category": ["Passenger", "Passenger", "Freight", "Freight"],
+            "vehicle_type": ["Passenger cars"] * 2 + ["Heavy goods vehicles"] * 2,
+            "year": [2000, 2001, 2000, 2001],
+            "TotalStock [vehicles]": value,
+        }
+    )
+
+
+@pytest.fixture
+def store(tmp_path) -> TidyStore:
+    """Store with two countries and versions."""
+    store = TidyStore(tmp_path / "idees.db")
+    for version in [2015, 2021]:
+        for country in ["DEU", "FRA"]:
+            store.add_section(
+                "TrRoad_tech", "RoadTotalStock", make_section(version, country, 1.0)
+            )
+    yield store
+    store.close()
+
+
+def test_catalog(store):
+    """Sections should be described in the catalog."""
+    catalog = store.get_catalog()
+    assert catalog[["sheet", "variable", "unit"]].to_numpy().tolist() == [
+        ["TrRoad_tech", "TotalStock", "vehicles"]
+    ]
+
+
+def test_replace(store):
+    """Re-adding a country and version should replace its data."""
+    store.add_section("TrRoad_tech", "RoadTotalStock", make_section(2021, "DEU", 2.0))
+    result = store.query(country="DEU", version=2021)
+    assert len(result) == 4  # noqa: PLR2004
+    assert (result["value"] == 2.0).all()  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    ("filters", "expected"),
+    [
+        ({}, 16),
+        ({"variable": "TotalStock", "country": "DE"}, 8),
+        ({"country": ["DEU", "FRA"], "years": 2000, "version": 2015}, 4),
+        ({"vehicle_type": "Passenger cars", "years": [2000, 2001]}, 8),
+        ({"variable": "Missing"}, 0),
+        ({"carrier": "Diesel"}, 0),
+    ],
+)
+def test_query(store, filters, expected):
+    """Queries should only return selected data."""
+    assert len(store.query(**filters)) == expected
+
+
+@pytest.mark.parametrize(
+    "filters", [{}, {"country": "ITA"}, {"carrier": "Diesel"}, {"years": 1990}]
+)
+def test_query_columns(store, filters):
+    """Results should have the same columns, even if nothing matches."""
+    assert list(store.query(**filters).columns) == [
+        "version",
+        "sector",
+        "country",
+        "variable",
+        "category",
+        "vehicle_type",
+        "year",
+        "value",
+        "unit",
+    ]
+
+
+def test_wide_layout(tmp_path):
+    """Wide data should be stored in long format."""
+    wide = make_section(2021, "DEU", 1.0).pivot_table(
+        index=["version", "sector", "country", "category", "vehicle_type"],
+        columns="year",
+        values="TotalStock [vehicles]",
+    )
+    wide = wide.reset_index()
+    wide.columns.name = "TotalStock [vehicles]"
+    store = TidyStore(tmp_path / "idees.db")
+    store.add_section("TrRoad_tech", "RoadTotalStock", wide)
+    assert sorted(store.query()["year"].unique()) == [2000, 2001]
+    store.close()
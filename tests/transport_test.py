@@ -7,6 +7,15 @@ import pytest
 import yaml
 
 from ec_jrc_idees.transport import TransportFile
+from ec_jrc_idees.utils import Metadata
+
+VEHICLE = {
+    "category": "Passenger",
+    "subcategory": "Road",
+    "vehicle_type": "Passenger cars",
+    "vehicle_subtype": "Diesel oil engine",
+}
+ENERGY = "TotalEnergyConsumption [ktoe]"
 
 
 @pytest.fixture
@@ -35,3 +44,162 @@ def test_tidy_transport(file):
         for sheet, sections in file.tidy_sheets.items()
         for section in sections
     )
+
+
+def test_tidy_transport_wide(transport_file, transport_cnf, version):
+    """The wide layout should keep years as numeric columns."""
+    file = TransportFile(transport_file, transport_cnf, layout="wide")
+    file.tidy_up()
+    for sections in file.tidy_sheets.values():
+        for tidy_df in sections.values():
+            years = [col for col in tidy_df.columns if isinstance(col, int)]
+            assert max(years) == version
+            assert all(pd.api.types.is_float_dtype(tidy_df[year]) for year in years)
+            assert tidy_df.columns.name.endswith("]")
+
+
+def test_select_transport(transport_file, transport_cnf):
+    """Only selected sheets and sections should be available."""
+    select = {"TrRoad_ene": None, "TrRoad_tech": ["RoadTotalStock"]}
+    file = TransportFile(transport_file, transport_cnf, select=select)
+    file.tidy_up()
+    assert list(file.tidy_sheets) == list(select)
+    assert list(file.tidy_sheets["TrRoad_tech"]) == ["RoadTotalStock"]
+    assert isinstance(file.tidy_sheets["TrRoad_tech"]["RoadTotalStock"], pd.DataFrame)
+
+
+def test_transport_unit_system(transport_file, transport_cnf):
+    """Values should be converted and relabelled in the requested unit system."""
+    select = {"TrRoad_ene": None}
+    original = TransportFile(transport_file, transport_cnf, select=select)
+    converted = TransportFile(
+        transport_file, transport_cnf, select=select, unit_system="si"
+    )
+    original.tidy_up()
+    converted.tidy_up()
+    ktoe = original.tidy_sheets["TrRoad_ene"]["RoadEnergyConsumption"]
+    tj = converted.tidy_sheets["TrRoad_ene"]["RoadEnergyConsumption"]
+    assert tj.columns[-1] == "TotalEnergyConsumption [TJ]"
+    pd.testing.assert_series_equal(
+        tj.iloc[:, -1], ktoe.iloc[:, -1] * 41.868, check_names=False
+    )
+
+
+@pytest.mark.parametrize("layout", ["long", "wide"])
+def test_transport_compact_dtypes(transport_file, transport_cnf, layout):
+    """Values and years should use the requested data types."""
+    file = TransportFile(
+        transport_file,
+        transport_cnf,
+        layout=layout,
+        value_dtype="float32",
+        year_dtype="int16",
+    )
+    file.tidy_up()
+    for sections in file.tidy_sheets.values():
+        for tidy_df in sections.values():
+            if layout == "long":
+                assert tidy_df["year"].dtype == "int16"
+                assert tidy_df.iloc[:, -1].dtype == "float32"
+            else:
+                years = [col for col in tidy_df.columns if isinstance(col, int)]
+                assert (tidy_df[years].dtypes == "float32").all()
+
+
+def test_transport_check(file):
+    """Cross-sheet checks should give one report per file."""
+    file.tidy_up()
+    report = file.check()
+    assert list(report["check"]) == list(TransportFile.CHECK_SECTIONS)
+    assert set(report["status"]) <= {"passed", "failed"}
+    assert (report.set_index("check")["status"] == "passed").all()
+    tidy_df = file.tidy_sheets["TrRoad_act"]["RoadVKM"]
+    assert set(report["country"]) == set(tidy_df["country"])
+
+
+def test_transport_check_skipped(transport_file, transport_cnf):
+    """Checks needing unselected sections should be skipped."""
+    file = TransportFile(transport_file, transport_cnf, select={"TrRoad_ene": None})
+    file.tidy_up()
+    status = file.check().set_index("check")["status"]
+    assert status.to_dict() == {
+        "vkm_stock_keys": "skipped",
+        "energy_per_vkm": "skipped",
+        "energy_totals": "passed",
+    }
+
+
+def make_section(value_name: str, values: list[float], **labels) -> pd.DataFrame:
+    """Create a small long tidy section of one vehicle over two years."""
+    prefix = {"version": 2021, "sector": "Transport", "country": "DEU"}
+    return pd.DataFrame(
+        {**prefix, **VEHICLE, **labels, "year": [2020, 2021], value_name: values}
+    )
+
+
+@pytest.fixture
+def memory_file(transport_cnf) -> TransportFile:
+    """Transport file holding consistent tidy data, without reading a workbook."""
+    file = TransportFile.__new__(TransportFile)
+    file.cnf = transport_cnf
+    file.metadata = Metadata(2021, "Transport", "DE")
+    # 6 ktoe / 100 mio km = 6 kgoe/100 km = 5 kgoe/100 km * 1.2
+    file.tidy_sheets = {
+        "TrRoad_act": {"RoadVKM": make_section("DistanceDriven [mio km]", [100, 100])},
+        "TrRoad_ene": {
+            "RoadEnergyConsumption": make_section(ENERGY, [6, 6], carrier="Diesel")
+        },
+        "TrRoad_tech": {
+            "RoadTotalStock": make_section("TotalStock [vehicles]", [1e4, 1e4]),
+            "RoadTotalStockTestEfficiency": make_section(
+                "TotalStockTestEfficiency [kgoe/100 km]", [5, 5]
+            ),
+            "RoadTotalStockTestDiscrepancy": make_section(
+                "TotalStockTestDiscrepancy [ratio]", [1.2, 1.2]
+            ),
+        },
+    }
+    file.get_idees_energy_total = lambda: pd.Series([6.0, 6.0], index=[2020, 2021])
+    return file
+
+
+def test_transport_check_passed(memory_file):
+    """Consistent data should pass all checks."""
+    report = memory_file.check()
+    assert (report["status"] == "passed").all()
+    assert set(report["country"]) == {"DEU"}
+
+
+@pytest.mark.parametrize(
+    ("check", "change", "failures"),
+    [
+        (
+            "vkm_stock_keys",
+            ("TrRoad_tech", "RoadTotalStock", {"vehicle_subtype": "LPG engine"}),
+            2,
+        ),
+        (
+            "energy_per_vkm",
+            ("TrRoad_ene", "RoadEnergyConsumption", {ENERGY: [6, 18]}),
+            1,
+        ),
+        (
+            "energy_per_vkm",
+            (
+                "TrRoad_tech",
+                "RoadTotalStockTestDiscrepancy",
+                {"TotalStockTestDiscrepancy [ratio]": [0.5, 1.2]},
+            ),
+            1,
+        ),
+        ("energy_totals", ("TrRoad_ene", "RoadEnergyConsumption", {ENERGY: [6, 7]}), 1),
+    ],
+)
+def test_transport_check_failed(memory_file, check, change, failures):
+    """Inconsistent data should be counted by the check it breaks."""
+    sheet, section, columns = change
+    tidy_sections = memory_file.tidy_sheets[sheet]
+    tidy_sections[section] = tidy_sections[section].assign(**columns)
+    report = memory_file.check().set_index("check")
+    assert report.loc[check, "status"] == "failed"
+    assert report.loc[check, "failures"] == failures
@@ -0,0 +1,55 @@
+"""Test numeric unit conversion."""
+
+import pytest
+
+from ec_jrc_idees import units
+
+
+@pytest.mark.parametrize(
+    ("source", "target", "factor"),
+    [
+        ("ktoe", "TJ", 41.868),
+        ("kgoe/100 km", "MJ/km", 0.41868),
+        ("mio km", "km", 1e6),
+        ("TJ", "ktoe", 1 / 41.868),
+    ],
+)
+def test_factor(source, target, factor):
+    """Factors should convert values between units of the same dimension."""
+    assert units.get_factor(source, target) == pytest.approx(factor)
+
+
+def test_incompatible_units():
+    """Units of different dimensions cannot be converted."""
+    with pytest.raises(ValueError, match="Incompatible units"):
+        units.get_factor("ktoe", "km")
+
+
+@pytest.mark.parametrize(
+    ("unit", "expected"),
+    [
+        ("ktoe", units.Conversion(41.868, "TJ")),
+        ("million km", units.Conversion(1e6, "km")),
+        ("vehicles", units.Conversion(1.0, "vehicles")),
+    ],
+)
+def test_conversion(unit, expected):
+    """Units should be converted to the system, or kept if not covered by it."""
+    factor, target = units.get_conversion(unit, "si")
+    assert target == expected.unit
+    assert factor == pytest.approx(expected.factor)
+
+
+def test_conversion_is_memoized():
+    """Repeated lookups should not recompute factors."""
+    units.get_conversion.cache_clear()
+    units.get_conversion("ktoe", "si")
+    units.get_conversion("ktoe", "si")
+    assert units.get_conversion.cache_info().hits == 1
+
+
+@pytest.mark.parametrize(("unit", "system"), [("furlongs", "si"), ("ktoe", "imperial")])
+def test_unknown(unit, system):
+    """Unknown units and systems should be rejected."""
+    with pytest.raises(ValueError, match="Unknown unit"):
+        units.get_conversion(unit, system)
@@ -81,3 +81,130 @@ def test_country_names(eu_code, expected):
     """Country codes should be in alpha3 format for maximum compatibility."""
     result = utils.convert_eu_code_to_alpha3(eu_code)
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    ("sheets", "sections", "expected"),
+    [
+        (None, None, {"A": None, "B": None}),
+        (["A"], None, {"A": None}),
+        (None, ["a2", "b1"], {"A": ["a2"], "B": ["b1"]}),
+        (["A", "B"], ["a1"], {"A": ["a1"]}),
+    ],
+)
+def test_get_selection(sheets, sections, expected):
+    """Lists of names should select only requested sheets and sections."""
+    cnf = {
+        "sheets": {
+            "A": {"sections": {"a1": {}, "a2": {}}},
+            "B": {"sections": {"b1": {}}},
+        }
+    }
+    assert utils.get_selection(cnf, sheets, sections) == expected
+
+
+@pytest.mark.parametrize(
+    ("sheets", "sections", "match"),
+    [
+        (["C"], None, "sheets not configured"),
+        (None, ["a3"], "sections not configured"),
+        (["B"], ["a1"], "No configured sections"),
+    ],
+)
+def test_get_selection_invalid(sheets, sections, match):
+    """Unknown names or empty selections should be rejected."""
+    cnf = {"sheets": {"A": {"sections": {"a1": {}}}, "B": {"sections": {"b1": {}}}}}
+    with pytest.raises(ValueError, match=match):
+        utils.get_selection(cnf, sheets, sections)
+
+
+def test_select_config():
+    """Selections should keep requested sheets and sections, and reject unknowns."""
+    cnf = {"sheets": {"A": {"sections": {"a1": {}, "a2": {}}}, "B": {"sections": {}}}}
+    selected = utils.select_config(cnf, {"A": ["a2"]})
+    assert list(selected["sheets"]) == ["A"]
+    assert list(selected["sheets"]["A"]["sections"]) == ["a2"]
+    assert list(cnf["sheets"]["A"]["sections"]) == ["a1", "a2"]
+    with pytest.raises(ValueError, match="sections not configured"):
+        utils.select_config(cnf, {"A": ["b1"]})
+
+
+def test_match_rules():
+    """The first matching rule should label each text, and unmatched text fail."""
+    rules = [
+        {"pattern": "Gasoline|Plug-in", "carrier": "Gasoline"},
+        {"pattern": "electric", "carrier": "Electricity"},
+    ]
+    text = pd.Series(["Plug-in hybrid electric", "Battery electric", "Gasoline"])
+    labels = utils.match_rules(text, rules, "carrier")
+    assert list(labels) == ["Gasoline", "Electricity", "Gasoline"]
+    with pytest.raises(ValueError, match="Could not identify carrier"):
+        utils.match_rules(pd.Series(["Hydrogen"]), rules, "carrier")
+
+
+def test_to_long_dataframe():
+    """Wide data should be melted using the variable stored in the column names."""
+    wide = pd.DataFrame({"carrier": ["Diesel"], 2000: [1.0], 2001: [2.0]})
+    wide.columns.name = "Energy [ktoe]"
+    long = utils.to_long_dataframe(wide)
+    assert list(long.columns) == ["carrier", "year", "Energy [ktoe]"]
+    assert long["year"].dtype == "int64"
+    assert utils.to_long_dataframe(long) is long
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_write_wide_dataframe(tmp_path, fmt):
+    """Wide files should keep their variable and unit when read back."""
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    wide = pd.DataFrame({"carrier": ["Diesel"], 2000: [1.0], 2001: [2.0]})
+    wide.columns.name = "TotalEnergyConsumption [ktoe]"
+    path = tmp_path / f"wide.{fmt}"
+    utils.write_dataframe(wide, path, fmt)
+    result = pd.read_csv(path) if fmt == "csv" else pd.read_parquet(path)
+    assert list(result.columns) == ["carrier", "variable", "unit", "2000", "2001"]
+    assert list(result["variable"]) == ["TotalEnergyConsumption"]
+    assert list(result["unit"]) == ["ktoe"]
+    assert wide.columns.name == "TotalEnergyConsumption [ktoe]"
+    assert "variable" not in wide.columns
+
+
+def test_year_column_mask():
+    """Only columns labelled with valid years should be identified."""
+    columns = pd.Index(["Germany", 2000, 2001, "2021", "Code", 1999, "Unnamed: 5"])
+    mask = utils.get_year_column_mask(columns)
+    assert list(columns[mask]) == [2000, 2001, "2021"]
+
+
+@pytest.fixture
+def validation() -> dict:
+    """Vocabularies of labeled columns."""
+    return {
+        "expected": {"category": ["Passenger", "Freight"]},
+        "optional": {"carrier": ["Diesel", "Electricity"]},
+    }
+
+
+def test_harmonize_labels(validation):
+    """Labels should be renamed into categoricals with the full vocabulary."""
+    data = pd.DataFrame(
+        {"category": ["Passenger transport", "Freight", "Passenger"], "value": 1.0}
+    )
+    remap = {"category": {"Passenger transport": "Passenger"}}
+    result = utils.harmonize_labels(data, remap, validation)
+    assert list(result["category"]) == ["Passenger", "Freight", "Passenger"]
+    assert list(result["category"].cat.categories) == ["Passenger", "Freight"]
+    assert data["category"][0] == "Passenger transport"
+
+
+@pytest.mark.parametrize(
+    ("data", "match"),
+    [
+        (pd.DataFrame({"carrier": ["Diesel"]}), "Missing expected columns"),
+        (pd.DataFrame({"category": ["Freight"], "carrier": ["Coal"]}), "Coal"),
+    ],
+)
+def test_harmonize_labels_invalid(validation, data, match):
+    """Missing columns or unexpected labels should be detected."""
+    with pytest.raises(ValueError, match=match):
+        utils.harmonize_labels(data, {}, validation)